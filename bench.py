@@ -0,0 +1,282 @@
+"""
+Benchmark suite for the engine, the searches and the referee.
+
+Every benchmark returns named measurements ``{"value", "unit",
+"higher_is_better"}``; the suite writes them as JSON and compares them with
+a stored baseline, flagging the ones that got worse by more than a
+tolerance. Usage::
+
+    python bench.py                      # run, compare with bench_baseline.json
+    python bench.py --save-baseline      # run and store the results as the baseline
+    python bench.py --quick --only state rollout --output results.json
+"""
+
+# Types
+from typing import Any, Callable
+
+# Libraries
+import argparse
+import gzip
+import json
+import os
+import pickle
+import platform
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+
+from connect4.bitboard_state import BitboardState
+from connect4.connect_state import ConnectState
+from connect4.knowledge import KnowledgeBase, StateStats, convert_legacy
+from connect4.mcts import random_rollout, root_from_board
+from connect4.policy import Policy
+from connect4.utils import forget_asset
+from groups.GroupA.policy import fast_rollout, run_mcts
+from groups.GroupB.policy import mcts, rollout
+from tournament import play
+
+Result = dict[str, Any]
+
+BASELINE_FILE = "bench_baseline.json"
+TOLERANCE = 0.2  # Relative change counted as a regression
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    """Runs ``fn`` ``repeat`` times and returns the best wall time and its result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        if elapsed < best:
+            best, result = elapsed, out
+    return best, result
+
+
+def rate(count: float, seconds: float, unit: str) -> Result:
+    return {"value": count / seconds, "unit": unit, "higher_is_better": True}
+
+
+def duration(seconds: float) -> Result:
+    return {"value": seconds, "unit": "s", "higher_is_better": False}
+
+
+class BenchPolicy(Policy):
+    """Uniformly random policy, as cheap as a policy can be."""
+
+    def mount(self) -> None:
+        self.rng = random.Random(0)
+
+    def act(self, s: np.ndarray) -> int:
+        return self.rng.choice([c for c in range(s.shape[1]) if s[0, c] == 0])
+
+
+def bench_state(quick: bool, repeat: int) -> dict[str, Result]:
+    """``transition`` + ``get_winner`` per second over random games."""
+    games = 50 if quick else 300
+    results = {}
+    for name, cls in (("connect_state", ConnectState), ("bitboard_state", BitboardState)):
+
+        def run() -> int:
+            rng = random.Random(0)
+            ops = 0
+            for _ in range(games):
+                state = cls()
+                while not state.is_final():
+                    state = state.transition(rng.choice(state.get_free_cols()))
+                    state.get_winner()
+                    ops += 1
+            return ops
+
+        seconds, ops = measure(run, repeat)
+        results[f"{name}.ops_per_s"] = rate(ops, seconds, "ops/s")
+    return results
+
+
+def bench_rollout(quick: bool, repeat: int) -> dict[str, Result]:
+    """Rollouts per second from the empty board for every rollout function."""
+    n = 2000 if quick else 20000
+    rollouts = (("GroupA.fast_rollout", fast_rollout), ("GroupB.rollout", rollout), ("mcts.random_rollout", random_rollout))
+    results = {}
+    for name, fn in rollouts:
+
+        def run() -> None:
+            random.seed(0)
+            for _ in range(n):
+                fn(0, 0, -1)
+
+        seconds, _ = measure(run, repeat)
+        results[f"{name}.rollouts_per_s"] = rate(n, seconds, "rollouts/s")
+    return results
+
+
+def bench_mcts(quick: bool, repeat: int) -> dict[str, Result]:
+    """MCTS iterations per second from the empty board at fixed time budgets."""
+    board = np.zeros((ConnectState.ROWS, ConnectState.COLS), dtype=int)
+    searches = (
+        ("GroupA.run_mcts", lambda root, t: run_mcts(board, -1, t, KnowledgeBase(), root=root)),
+        ("GroupB.mcts", lambda root, t: mcts(board, -1, t, root=root)),
+    )
+    results = {}
+    for budget in (0.1,) if quick else (0.1, 0.5):
+        for name, search in searches:
+            best = 0.0
+            for _ in range(repeat):
+                random.seed(0)
+                root = root_from_board(board, -1)
+                start = time.perf_counter()
+                search(root, budget)
+                best = max(best, root.visits / (time.perf_counter() - start))
+            results[f"{name}.{budget}s.iterations_per_s"] = {
+                "value": best, "unit": "iterations/s", "higher_is_better": True
+            }
+    return results
+
+
+def bench_knowledge(quick: bool, repeat: int) -> dict[str, Result]:
+    """Save, load and legacy conversion time of knowledge bases of several sizes."""
+    rng = np.random.default_rng(0)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (10_000,) if quick else (10_000, 100_000, 500_000):
+            keys = rng.choice(1 << 62, size=size, replace=False)
+            visits = rng.integers(1, 100, size=size)
+            wins = rng.random(size) * visits
+            stats = {int(k): StateStats(float(w), int(v)) for k, w, v in zip(keys, wins, visits)}
+            path = os.path.join(tmp, f"{size}.kb")
+            probes = [int(k) for k in keys[:1000]]
+
+            kb = KnowledgeBase.from_stats(stats)
+            seconds, _ = measure(lambda: kb.save(path), repeat)
+            results[f"knowledge.{size}.save_s"] = duration(seconds)
+
+            def load() -> None:
+                forget_asset(path)
+                loaded = KnowledgeBase(path)
+                for k in probes:
+                    loaded.get(k)
+
+            seconds, _ = measure(load, repeat)
+            results[f"knowledge.{size}.load_s"] = duration(seconds)
+
+            legacy = os.path.join(tmp, f"{size}.pkl.gz")
+            with gzip.open(legacy, "wb") as f:
+                pickle.dump({k: (s.wins, s.visits) for k, s in stats.items()}, f)
+            seconds, _ = measure(lambda: convert_legacy(legacy, path), repeat)
+            results[f"knowledge.{size}.legacy_convert_s"] = duration(seconds)
+    return results
+
+
+def bench_tournament(quick: bool, repeat: int) -> dict[str, Result]:
+    """Games per minute through ``tournament.play`` with random policies."""
+    best_of = 21 if quick else 101
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "versus"))
+        os.chdir(tmp)
+        try:
+
+            def run() -> int:
+                play(("a", BenchPolicy), ("b", BenchPolicy), best_of, 0.5)
+                with open("versus/match_a_vs_b.json") as f:
+                    match = json.load(f)
+                return match["player_a_wins"] + match["player_b_wins"] + match["draws"]
+
+            seconds, games = measure(run, repeat)
+        finally:
+            os.chdir(cwd)
+    return {"tournament.play.games_per_min": rate(games * 60, seconds, "games/min")}
+
+
+BENCHMARKS: dict[str, Callable[[bool, int], dict[str, Result]]] = {
+    "state": bench_state,
+    "rollout": bench_rollout,
+    "mcts": bench_mcts,
+    "knowledge": bench_knowledge,
+    "tournament": bench_tournament,
+}
+
+
+def run_benchmarks(names: list[str] | None = None, quick: bool = False, repeat: int = 3) -> dict[str, Any]:
+    """
+    Runs the selected benchmarks.
+
+    Parameters
+    ----------
+    names : list[str], optional
+        Benchmarks to run (keys of ``BENCHMARKS``), all of them when omitted.
+    quick : bool, optional
+        Whether to use smaller workloads, for a fast sanity check.
+    repeat : int, optional
+        Runs of every measurement; the best one is kept.
+
+    Returns
+    -------
+    dict[str, Any]
+        ``{"meta": {...}, "results": {name: result}}``, ready to dump as JSON.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        start = time.perf_counter()
+        results.update(BENCHMARKS[name](quick, repeat))
+        print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float = TOLERANCE) -> list[str]:
+    """
+    Compares two runs and returns a line per measurement, prefixed with
+    ``REGRESSION`` when it is worse than the baseline by more than ``tolerance``.
+    Measurements missing from either run are skipped.
+    """
+    lines = []
+    base = baseline["results"]
+    for name, result in current["results"].items():
+        if name not in base:
+            continue
+        old, new = base[name]["value"], result["value"]
+        change = (new - old) / old if old else 0.0
+        worse = -change if result["higher_is_better"] else change
+        flag = "REGRESSION" if worse > tolerance else "ok"
+        lines.append(f"{flag:<10} {name}: {old:.4g} -> {new:.4g} {result['unit']} ({change:+.1%})")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect4 benchmark suite.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best kept)")
+    parser.add_argument("--output", help="file to write the results to")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="relative change flagged as regression")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.only, args.quick, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=4)
+        print(f"Baseline written to {args.baseline}.")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            lines = compare(current, json.load(f), args.tolerance)
+        print("\n".join(lines))
+        if any(line.startswith("REGRESSION") for line in lines):
+            sys.exit(1)
+    else:
+        print(json.dumps(current["results"], indent=4))
@@ -0,0 +1,205 @@
+# Types
+from typing import Callable
+
+# Libraries
+import time
+import numpy as np
+
+from connect4.bitboard_state import BOARD_MASK, BOTTOM_MASKS, COL_HEIGHT, COLS, ROWS, TOP_MASKS
+from connect4.mcts import MCTS, Node, add_virtual_loss
+
+BOTTOMS = np.array(BOTTOM_MASKS, dtype=np.uint64)
+TOPS = np.array(TOP_MASKS, dtype=np.uint64)
+FULL = np.uint64(BOARD_MASK)
+# Bit of every board cell, row 0 being the top as in ConnectState.board
+CELL_BITS = np.array(
+    [[1 << (c * COL_HEIGHT + ROWS - 1 - r) for c in range(COLS)] for r in range(ROWS)],
+    dtype=np.uint64,
+)
+# Shifts of the horizontal, both diagonal and vertical line checks
+SHIFTS = tuple(np.uint64(s) for s in (COL_HEIGHT, COL_HEIGHT - 1, COL_HEIGHT + 1, 1))
+
+
+def has_won_batch(bitboards: np.ndarray) -> np.ndarray:
+    """
+    Vectorized ``has_won`` over an array of single-player bitboards.
+
+    Parameters
+    ----------
+    bitboards : np.ndarray
+        uint64 array of bitboards.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array, True where the bitboard contains a line of four.
+    """
+    won = np.zeros(bitboards.shape, dtype=bool)
+    for shift in SHIFTS:
+        m = bitboards & (bitboards >> shift)
+        won |= (m & (m >> (shift + shift))) != 0
+    return won
+
+
+def legal_mask_batch(mask: np.ndarray) -> np.ndarray:
+    """Returns a (K, COLS) boolean array of the columns that are not full."""
+    return (mask[:, None] & TOPS) == 0
+
+
+def play_batch(
+    position: np.ndarray, mask: np.ndarray, cols: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``apply_move``: plays ``cols[i]`` for the player to move in game ``i``."""
+    return position ^ mask, mask | (mask + BOTTOMS[cols])
+
+
+def boards_to_bitboards(
+    boards: np.ndarray, players: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized ``board_to_bitboards`` over a (K, ROWS, COLS) stack of boards.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        uint64 ``position`` (discs of ``players[i]``) and ``mask`` arrays.
+    """
+    players = np.asarray(players).reshape(-1, 1, 1)
+    position = np.where(boards == players, CELL_BITS, np.uint64(0)).sum(axis=(1, 2), dtype=np.uint64)
+    mask = np.where(boards != 0, CELL_BITS, np.uint64(0)).sum(axis=(1, 2), dtype=np.uint64)
+    return position, mask
+
+
+def batch_rollout(
+    position: int | np.ndarray,
+    mask: int | np.ndarray,
+    player: int | np.ndarray,
+    k: int | None = None,
+    rng: np.random.Generator | None = None,
+    max_plies: int = ROWS * COLS,
+) -> np.ndarray:
+    """
+    Plays K uniformly random games at once.
+
+    Parameters
+    ----------
+    position, mask, player : int | np.ndarray
+        Starting position, either a single one repeated ``k`` times or one per game.
+    k : int, optional
+        Number of games, taken from the array arguments when omitted.
+    rng : np.random.Generator, optional
+        Random generator, a fresh one is created when omitted.
+    max_plies : int, optional
+        Number of plies after which unfinished games are scored as draws.
+
+    Returns
+    -------
+    np.ndarray
+        int8 array with the winner of every game (-1 or 1), or 0 for a draw.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if k is None:
+        k = np.broadcast(np.asarray(position), np.asarray(mask), np.asarray(player)).size
+    position = np.broadcast_to(np.asarray(position, dtype=np.uint64), (k,)).copy()
+    mask = np.broadcast_to(np.asarray(mask, dtype=np.uint64), (k,)).copy()
+    player = np.broadcast_to(np.asarray(player, dtype=np.int8), (k,)).copy()
+
+    winners = np.zeros(k, dtype=np.int8)
+    # Only the games still running are simulated, the arrays shrink as they end
+    idx = np.flatnonzero((mask & FULL) != FULL)
+    position, mask, player = position[idx], mask[idx], player[idx]
+    for _ in range(max_plies):
+        if not idx.size:
+            break
+        # Uniform choice among the legal columns: the largest random score wins
+        legal = legal_mask_batch(mask)
+        cols = np.argmax(rng.random((idx.size, COLS)) * legal, axis=1)
+        position, mask = play_batch(position, mask, cols)
+        won = has_won_batch(position ^ mask)
+        winners[idx[won]] = player[won]
+        running = ~won & ((mask & FULL) != FULL)
+        idx, position, mask, player = idx[running], position[running], mask[running], -player[running]
+    return winners
+
+
+def averaged_rollout(
+    k: int, rng: np.random.Generator | None = None, max_plies: int = ROWS * COLS
+) -> Callable[[int, int, int], float]:
+    """Returns an engine rollout averaging ``k`` vectorized playouts from the leaf."""
+
+    def rollout(position: int, mask: int, player: int) -> float:
+        return float(batch_rollout(position, mask, player, k, rng, max_plies).mean())
+
+    return rollout
+
+
+def batched_search(
+    engine: MCTS,
+    root: Node,
+    time_limit: float,
+    leaves: int = 32,
+    rollouts_per_leaf: int = 16,
+    virtual_loss: float = 0.0,
+    rng: np.random.Generator | None = None,
+    max_plies: int = ROWS * COLS,
+) -> int:
+    """
+    Searches with vectorized rollouts over batches of leaves.
+
+    Each batch selects ``leaves`` leaves under virtual loss, simulates
+    ``rollouts_per_leaf`` games from each of them in a single ``batch_rollout``
+    call and backs up the averaged result of every leaf.
+
+    Parameters
+    ----------
+    engine : MCTS
+        Engine providing the selection, backup and expansion hooks.
+    root : Node
+        Root of the search tree, updated in place.
+    time_limit : float
+        Wall-clock budget in seconds.
+    leaves : int, optional
+        Leaves selected per batch.
+    rollouts_per_leaf : int, optional
+        Random games simulated from every leaf.
+    virtual_loss : float, optional
+        Reward counted for a pending leaf, the loss reward of the backup.
+    rng : np.random.Generator, optional
+        Random generator for the rollouts.
+    max_plies : int, optional
+        Rollout length after which a game is scored as a draw.
+
+    Returns
+    -------
+    int
+        Number of leaves evaluated.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    deadline = time.perf_counter() + time_limit
+    done = 0
+    while time.perf_counter() < deadline:
+        batch = []
+        for _ in range(leaves):
+            node = engine.descend(root)
+            add_virtual_loss(node, virtual_loss, 1)
+            batch.append(node)
+
+        pending = [node for node in batch if node.winner is None]
+        if pending:
+            winners = batch_rollout(
+                np.repeat([node.position for node in pending], rollouts_per_leaf),
+                np.repeat([node.mask for node in pending], rollouts_per_leaf),
+                np.repeat([node.player for node in pending], rollouts_per_leaf),
+                rng=rng,
+                max_plies=max_plies,
+            )
+            outcomes = iter(winners.reshape(-1, rollouts_per_leaf).mean(axis=1).tolist())
+        for node in batch:
+            add_virtual_loss(node, virtual_loss, -1)
+            engine.backup(node, node.winner if node.winner is not None else next(outcomes))
+        done += len(batch)
+        if root.winner is not None:
+            break  # Proven, further batches cannot change the choice
+    return done
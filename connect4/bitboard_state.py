@@ -0,0 +1,314 @@
+# Abstract
+from connect4.environment_state import EnvironmentState
+
+# Types
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+
+# Libraries
+import numpy as np
+
+
+ROWS = 6
+COLS = 7
+# Each column uses ROWS + 1 bits: the extra sentinel bit keeps the shifts used
+# in the win check from wrapping from one column into the next.
+COL_HEIGHT = ROWS + 1
+
+BOTTOM_MASKS = tuple(1 << (c * COL_HEIGHT) for c in range(COLS))
+TOP_MASKS = tuple(1 << (ROWS - 1 + c * COL_HEIGHT) for c in range(COLS))
+COLUMN_MASKS = tuple(((1 << ROWS) - 1) << (c * COL_HEIGHT) for c in range(COLS))
+BOTTOM = sum(BOTTOM_MASKS)
+BOARD_MASK = BOTTOM * ((1 << ROWS) - 1)
+
+
+def has_won(bitboard: int) -> bool:
+    """
+    Checks whether a single player's bitboard contains four aligned discs.
+
+    Parameters
+    ----------
+    bitboard : int
+        Discs of one player in the column-major bitboard layout.
+
+    Returns
+    -------
+    bool
+        True if the discs contain a horizontal, vertical or diagonal line of four.
+    """
+    # Horizontal
+    m = bitboard & (bitboard >> COL_HEIGHT)
+    if m & (m >> (2 * COL_HEIGHT)):
+        return True
+    # Diagonal "\"
+    m = bitboard & (bitboard >> (COL_HEIGHT - 1))
+    if m & (m >> (2 * (COL_HEIGHT - 1))):
+        return True
+    # Diagonal "/"
+    m = bitboard & (bitboard >> (COL_HEIGHT + 1))
+    if m & (m >> (2 * (COL_HEIGHT + 1))):
+        return True
+    # Vertical
+    m = bitboard & (bitboard >> 1)
+    return bool(m & (m >> 2))
+
+
+def position_key(position: int, mask: int, player: int) -> int:
+    """
+    Computes a unique integer key for a position.
+
+    The key adds the discs of player 1 to the occupancy mask, which identifies the
+    board regardless of which player is to move.
+
+    Parameters
+    ----------
+    position : int
+        Discs of ``player``.
+    mask : int
+        Every disc on the board.
+    player : int
+        Player owning the discs in ``position``.
+
+    Returns
+    -------
+    int
+        Key that fits in 64 bits.
+    """
+    return (position if player == 1 else position ^ mask) + mask
+
+
+def mirror_key(key: int) -> int:
+    """Mirrors a bitboard or position key left to right by reversing its columns."""
+    column = (1 << COL_HEIGHT) - 1
+    mirrored = 0
+    for c in range(COLS):
+        mirrored |= ((key >> (c * COL_HEIGHT)) & column) << ((COLS - 1 - c) * COL_HEIGHT)
+    return mirrored
+
+
+def update_keys(key: int, mirror: int, cell: int, col: int, player: int) -> tuple[int, int]:
+    """
+    Updates a position key and the key of its mirror image after a move.
+
+    Both keys add one bit per disc to a column, or two for a disc of player 1,
+    and never carry into the next column, so a move changes them by a fixed
+    amount and neither has to be recomputed.
+
+    Parameters
+    ----------
+    key, mirror : int
+        Keys before the move, see ``position_key`` and ``mirror_key``.
+    cell : int
+        Single bit of the cell where the disc lands.
+    col : int
+        Column of the move.
+    player : int
+        Player making the move.
+
+    Returns
+    -------
+    tuple[int, int]
+        Keys after the move.
+    """
+    step = 2 if player == 1 else 1
+    mirrored_cell = (cell >> (col * COL_HEIGHT)) << ((COLS - 1 - col) * COL_HEIGHT)
+    return key + step * cell, mirror + step * mirrored_cell
+
+
+def canonical_key(key: int) -> tuple[int, bool]:
+    """
+    Maps a position key to the smallest key among the position and its mirror.
+
+    Parameters
+    ----------
+    key : int
+        Position key, see ``position_key``.
+
+    Returns
+    -------
+    tuple[int, bool]
+        Canonical key and whether it is the mirrored position, in which case
+        actions must go through ``canonical_action``.
+    """
+    mirrored = mirror_key(key)
+    return (mirrored, True) if mirrored < key else (key, False)
+
+
+def canonical_action(col: int, mirrored: bool) -> int:
+    """Translates a column to or from the canonical orientation (the mapping is its own inverse)."""
+    return COLS - 1 - col if mirrored else col
+
+
+def player_to_move(board: np.ndarray) -> int:
+    """
+    Infers the player to move from the disc count, -1 (Red) moving first.
+
+    Parameters
+    ----------
+    board : np.ndarray
+        Board with -1/1 discs and 0 for empty cells.
+
+    Returns
+    -------
+    int
+        -1 if both players have the same number of discs, 1 otherwise.
+    """
+    return -1 if np.count_nonzero(board == -1) <= np.count_nonzero(board == 1) else 1
+
+
+def board_to_bitboards(board: np.ndarray, player: int) -> tuple[int, int]:
+    """
+    Encodes a (ROWS, COLS) board as a (position, mask) bitboard pair.
+
+    Parameters
+    ----------
+    board : np.ndarray
+        Board with -1/1 discs and 0 for empty cells, row 0 being the top.
+    player : int
+        Player whose discs are stored in ``position``.
+
+    Returns
+    -------
+    tuple[int, int]
+        ``position`` holding the discs of ``player`` and ``mask`` holding every disc.
+    """
+    position = 0
+    mask = 0
+    for c in range(COLS):
+        for r in range(ROWS):
+            cell = board[ROWS - 1 - r, c]
+            if cell != 0:
+                bit = 1 << (c * COL_HEIGHT + r)
+                mask |= bit
+                if cell == player:
+                    position |= bit
+    return position, mask
+
+
+def bitboards_to_board(position: int, mask: int, player: int) -> np.ndarray:
+    """
+    Decodes a (position, mask) bitboard pair into a (ROWS, COLS) board.
+
+    Parameters
+    ----------
+    position : int
+        Discs of ``player``.
+    mask : int
+        Every disc on the board.
+    player : int
+        Player owning the discs in ``position``.
+
+    Returns
+    -------
+    np.ndarray
+        Board with -1/1 discs and 0 for empty cells, row 0 being the top.
+    """
+    board = np.zeros((ROWS, COLS), dtype=int)
+    for c in range(COLS):
+        for r in range(ROWS):
+            bit = 1 << (c * COL_HEIGHT + r)
+            if mask & bit:
+                board[ROWS - 1 - r, c] = player if position & bit else -player
+    return board
+
+
+class BitboardState(EnvironmentState):
+    """
+    Connect Four state backed by two 64-bit bitboards.
+
+    ``position`` holds the discs of the player to move and ``mask`` holds every
+    disc; bit ``c * (ROWS + 1) + r`` is the cell of column ``c`` at height ``r``
+    counted from the bottom. The ``board`` array used by ``Policy.act`` is
+    decoded on demand, so the state is a drop-in replacement for ``ConnectState``.
+    """
+
+    ROWS = ROWS
+    COLS = COLS
+
+    __slots__ = ("position", "mask", "player", "_board", "_winner")
+
+    def __init__(self, board: np.ndarray | None = None, player: int = -1):
+        if board is None:
+            self.position, self.mask = 0, 0
+        else:
+            self.position, self.mask = board_to_bitboards(board, player)
+        self.player = player  # -1 = Red, 1 = Yellow type: ignore
+        self._board: np.ndarray | None = None
+        self._winner: int | None = None
+
+    @classmethod
+    def from_bitboards(cls, position: int, mask: int, player: int) -> "BitboardState":
+        """Builds a state straight from its bitboards, skipping the board decoding."""
+        state = cls.__new__(cls)
+        state.position = position
+        state.mask = mask
+        state.player = player
+        state._board = None
+        state._winner = None
+        return state
+
+    @property
+    def board(self) -> np.ndarray:
+        if self._board is None:
+            self._board = bitboards_to_board(self.position, self.mask, self.player)
+        return self._board
+
+    @property
+    def key(self) -> int:
+        """Unique integer key of the position, see ``position_key``."""
+        return position_key(self.position, self.mask, self.player)
+
+    def is_final(self) -> bool:
+        return self.get_winner() != 0 or self.mask & BOARD_MASK == BOARD_MASK
+
+    def is_applicable(self, event: Any) -> bool:
+        return (
+            isinstance(event, int)
+            and 0 <= event < self.COLS
+            and self.is_col_free(event)
+            and not self.is_final()
+        )
+
+    def get_winner(self) -> int:
+        if self._winner is None:
+            # The player who just moved is the only one who can have a new line,
+            # the other side is still checked for states built from a board.
+            if has_won(self.position ^ self.mask):
+                self._winner = -self.player
+            elif has_won(self.position):
+                self._winner = self.player
+            else:
+                self._winner = 0
+        return self._winner
+
+    def is_col_free(self, col: int) -> bool:
+        return not self.mask & TOP_MASKS[col]
+
+    def get_heights(self) -> list[int]:
+        return [
+            ((self.mask >> (c * COL_HEIGHT)) & COLUMN_MASKS[0]).bit_length()
+            for c in range(self.COLS)
+        ]
+
+    def get_free_cols(self) -> list[int]:
+        return [c for c in range(self.COLS) if not self.mask & TOP_MASKS[c]]
+
+    def transition(self, col: int) -> "BitboardState":
+        if not self.is_applicable(col):
+            raise ValueError(f"Move not allowed in column {col}.")
+
+        # The opponent's discs become the position of the next player to move
+        new_mask = self.mask | (self.mask + BOTTOM_MASKS[col])
+        state = BitboardState.from_bitboards(
+            self.position ^ self.mask, new_mask, -self.player
+        )
+        state._winner = -state.player if has_won(state.position ^ new_mask) else 0
+        return state
+
+    def show(self, size: int = 1500, ax: "Axes | None" = None) -> None:
+        # matplotlib is imported on first use only
+        from connect4.visualization import show_board
+
+        show_board(self.board, size, ax)
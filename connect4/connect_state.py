@@ -1,27 +1,128 @@
 # Abstract
 from connect4.environment_state import EnvironmentState
+from connect4.bitboard_state import COL_HEIGHT, board_to_bitboards, mirror_key, update_keys
 
 # Types
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
 
 # Libraries
 import numpy as np
-import matplotlib.pyplot as plt
+
+# Line directions (row step, column step): horizontal, vertical and both diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def drop_piece(board: np.ndarray, col: int, player: int) -> int:
+    """
+    Drops a disc of ``player`` in ``col`` in place.
+
+    Parameters
+    ----------
+    board : np.ndarray
+        Board to modify, row 0 being the top.
+    col : int
+        Column where the disc is dropped.
+    player : int
+        Disc value to place (-1 or 1).
+
+    Returns
+    -------
+    int
+        Row where the disc landed, or -1 if the column is full.
+    """
+    for r in range(board.shape[0] - 1, -1, -1):
+        if board[r, col] == 0:
+            board[r, col] = player
+            return r
+    return -1
+
+
+def connects_four(board: np.ndarray, row: int, col: int) -> bool:
+    """
+    Checks whether the disc at (row, col) is part of a line of four.
+
+    Only the four lines going through the cell are inspected, which is enough to
+    detect a win right after a disc has been placed there.
+
+    Parameters
+    ----------
+    board : np.ndarray
+        Board to inspect.
+    row : int
+        Row of the last placed disc.
+    col : int
+        Column of the last placed disc.
+
+    Returns
+    -------
+    bool
+        True if the owner of the disc has four aligned discs through it.
+    """
+    player = board[row, col]
+    if player == 0:
+        return False
+    rows, cols = board.shape
+    for dr, dc in DIRECTIONS:
+        count = 1
+        r, c = row + dr, col + dc
+        while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
+            count += 1
+            r += dr
+            c += dc
+        r, c = row - dr, col - dc
+        while 0 <= r < rows and 0 <= c < cols and board[r, c] == player:
+            count += 1
+            r -= dr
+            c -= dc
+        if count >= 4:
+            return True
+    return False
 
 
 class ConnectState(EnvironmentState):
     ROWS = 6
     COLS = 7
 
-    def __init__(self, board: np.ndarray | None = None, player: int = -1):
+    def __init__(
+        self,
+        board: np.ndarray | None = None,
+        player: int = -1,
+        last_move: tuple[int, int] | None = None,
+    ):
         if board is None:
             self.board = np.zeros((self.ROWS, self.COLS), dtype=int)
         else:
             self.board = board.copy()
         self.player = player  # -1 = Red, 1 = Yellow type: ignore
+        self.last_move = last_move  # (row, col) of the last placed disc
+        # Winner cache: unknown (None) until computed, known right away after a move
+        self._winner: int | None = None
+        if last_move is not None and connects_four(self.board, *last_move):
+            self._winner = int(self.board[last_move])
+        elif board is None or last_move is not None:
+            self._winner = 0
+        # Position keys (own, mirrored): unknown for an arbitrary board, updated on every move
+        self._keys: tuple[int, int] | None = (0, 0) if board is None else None
+
+    @property
+    def key(self) -> int:
+        """Position key of the board, the one used by ``BitboardState`` and the knowledge base."""
+        if self._keys is None:
+            ones, mask = board_to_bitboards(self.board, 1)
+            self._keys = ones + mask, mirror_key(ones + mask)
+        return self._keys[0]
+
+    @property
+    def canonical_key(self) -> int:
+        """Key shared by the position and its mirror image, see ``canonical_key``."""
+        key = self.key
+        return min(key, self._keys[1])
 
     def is_final(self) -> bool:
-        return self.get_winner() != 0 or not any(self.board[0] == 0)
+        return self.get_winner() != 0 or not (self.board[0] == 0).any()
 
     def is_applicable(self, event: Any) -> bool:
         return (
@@ -32,6 +133,12 @@ class ConnectState(EnvironmentState):
         )
 
     def get_winner(self) -> int:
+        if self._winner is None:
+            self._winner = self._scan_winner()
+        return self._winner
+
+    def _scan_winner(self) -> int:
+        # Full scan, only needed for states built from an arbitrary board
         # Check all 4 directions
         for r in range(self.ROWS):
             for c in range(self.COLS):
@@ -43,26 +150,26 @@ class ConnectState(EnvironmentState):
                 if c + 3 < self.COLS and all(
                     self.board[r, c + i] == player for i in range(4)
                 ):
-                    return player
+                    return int(player)
                 # Down
                 if r + 3 < self.ROWS and all(
                     self.board[r + i, c] == player for i in range(4)
                 ):
-                    return player
+                    return int(player)
                 # Diagonal right-down
                 if (
                     r + 3 < self.ROWS
                     and c + 3 < self.COLS
                     and all(self.board[r + i, c + i] == player for i in range(4))
                 ):
-                    return player
+                    return int(player)
                 # Diagonal left-down
                 if (
                     r + 3 < self.ROWS
                     and c - 3 >= 0
                     and all(self.board[r + i, c - i] == player for i in range(4))
                 ):
-                    return player
+                    return int(player)
 
         return 0
 
@@ -89,32 +196,16 @@ class ConnectState(EnvironmentState):
             raise ValueError(f"Move not allowed in column {col}.")
 
         new_board = self.board.copy()
-        for r in reversed(range(self.ROWS)):
-            if new_board[r, col] == 0:
-                new_board[r, col] = self.player
-                break
-
-        return ConnectState(new_board, -self.player)
-
-    def show(self, size: int = 1500, ax: plt.Axes | None = None) -> None:
-        if ax is None:
-            fig, ax = plt.subplots()
-        else:
-            fig = None
-
-        pos_red = np.where(self.board == -1)
-        pos_yellow = np.where(self.board == 1)
-
-        ax.scatter(pos_yellow[1] + 0.5, 5.5 - pos_yellow[0], color="yellow", s=size)
-        ax.scatter(pos_red[1] + 0.5, 5.5 - pos_red[0], color="red", s=size)
+        row = drop_piece(new_board, col, self.player)
 
-        ax.set_ylim([0, self.board.shape[0]])
-        ax.set_xlim([0, self.board.shape[1]])
-        ax.set_xticks(np.arange(self.board.shape[1] + 1))
-        ax.set_yticks(np.arange(self.board.shape[0] + 1))
-        ax.grid(True)
+        state = ConnectState(new_board, -self.player, last_move=(row, col))
+        if self._keys is not None:
+            cell = 1 << (col * COL_HEIGHT + self.ROWS - 1 - row)
+            state._keys = update_keys(*self._keys, cell, col, self.player)
+        return state
 
-        ax.set_title("Connect Four")
+    def show(self, size: int = 1500, ax: "Axes | None" = None) -> None:
+        # matplotlib is imported on first use only
+        from connect4.visualization import show_board
 
-        if fig is not None:
-            plt.show()
+        show_board(self.board, size, ax)
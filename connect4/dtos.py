@@ -1,17 +1,82 @@
+from typing import TYPE_CHECKING
 from pydantic import BaseModel, ConfigDict, Field
 from connect4.policy import Policy
 import numpy as np
 
+if TYPE_CHECKING:
+    from connect4.mcts import SearchStats
+
 State = np.ndarray
 Action = int
 Participant = tuple[str, Policy]
 Versus = list[tuple[Participant | None, Participant | None]]
 
+# Phases of a search iteration timed by connect4.mcts.SearchStats
+PHASES = ("selection", "expansion", "rollout", "backup")
+
 
 class Game(list[tuple[State, Action]]):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
+class LatencyStats(BaseModel):
+    moves: int = Field(default=0, description="Moves measured.")
+    p50: float = Field(default=0.0, description="Median move time in seconds.")
+    p95: float = Field(default=0.0, description="95th percentile move time in seconds.")
+    max: float = Field(default=0.0, description="Slowest move time in seconds.")
+
+    @classmethod
+    def from_samples(cls, samples: list[float]) -> "LatencyStats":
+        if not samples:
+            return cls()
+        p50, p95 = np.percentile(samples, [50, 95])
+        return cls(moves=len(samples), p50=float(p50), p95=float(p95), max=float(np.max(samples)))
+
+
+class PlayerLatency(BaseModel):
+    overall: LatencyStats = Field(default_factory=LatencyStats, description="Every move of the player.")
+    phases: dict[str, LatencyStats] = Field(
+        default={},
+        description="Moves grouped by game phase (opening, middlegame, endgame).",
+    )
+    timeouts: int = Field(default=0, description="Moves that exceeded the time limit.")
+
+
+class SearchTelemetry(BaseModel):
+    moves: int = Field(default=0, description="Moves with search statistics.")
+    iterations: int = Field(default=0, description="Search iterations over every move.")
+    nodes: int = Field(default=0, description="Tree nodes created over every move.")
+    max_depth: int = Field(default=0, description="Deepest selected leaf.")
+    mean_depth: float = Field(default=0.0, description="Mean depth of the selected leaves.")
+    kb_hit_rate: float = Field(default=0.0, description="Fraction of knowledge base lookups that found the state.")
+    root_focus: float = Field(
+        default=0.0,
+        description="Mean share of the root visits spent on the most visited child.",
+    )
+    phase_time: dict[str, float] = Field(
+        default={},
+        description="Seconds spent in each search phase (selection, expansion, rollout, backup).",
+    )
+
+    @classmethod
+    def from_stats(cls, stats: list["SearchStats"]) -> "SearchTelemetry":
+        if not stats:
+            return cls()
+        iterations = sum(s.iterations for s in stats)
+        lookups = sum(s.kb_hits + s.kb_misses for s in stats)
+        shares = [max(s.root_visits) / sum(s.root_visits) for s in stats if sum(s.root_visits)]
+        return cls(
+            moves=len(stats),
+            iterations=iterations,
+            nodes=sum(s.nodes for s in stats),
+            max_depth=max(s.max_depth for s in stats),
+            mean_depth=sum(s.depth_sum for s in stats) / iterations if iterations else 0.0,
+            kb_hit_rate=sum(s.kb_hits for s in stats) / lookups if lookups else 0.0,
+            root_focus=float(np.mean(shares)) if shares else 0.0,
+            phase_time={phase: sum(s.phase_time[phase] for s in stats) for phase in PHASES},
+        )
+
+
 class Match(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -26,3 +91,13 @@ class Match(BaseModel):
         default=[],
         description="List of the history of each game, a state-action pair list produced by the alternating sequence of player actions.",
     )
+
+    latency: dict[str, PlayerLatency] = Field(
+        default={},
+        description="Move time statistics of each player, keyed by player name.",
+    )
+
+    telemetry: dict[str, SearchTelemetry] = Field(
+        default={},
+        description="Search statistics of each player that reports them, keyed by player name (opt-in).",
+    )
@@ -0,0 +1,520 @@
+# Types
+from typing import Iterator
+
+# Libraries
+import glob
+import gzip
+import os
+import pickle
+import sys
+import threading
+import numpy as np
+
+from connect4.bitboard_state import board_to_bitboards, canonical_key, position_key
+from connect4.utils import forget_asset, load_asset
+
+# File layout: MAGIC, entry count (uint64), then the sorted uint64 keys, the
+# float32 wins and the uint32 visits as three parallel little-endian arrays.
+MAGIC = b"C4KB\x00\x00\x00\x01"
+HEADER_SIZE = len(MAGIC) + 8
+KEY_DTYPE = np.dtype("<u8")
+WINS_DTYPE = np.dtype("<f4")
+VISITS_DTYPE = np.dtype("<u4")
+
+
+class StateStats:
+    """
+    Accumulated statistics of a position, from the point of view of the player
+    who moved into it.
+    """
+
+    __slots__ = ["wins", "visits"]
+
+    def __init__(self, wins: float = 0.0, visits: int = 0):
+        self.wins = wins
+        self.visits = visits
+
+
+def write_knowledge(path: str, keys: np.ndarray, wins: np.ndarray, visits: np.ndarray) -> None:
+    """
+    Writes a knowledge base file, sorting the entries by key.
+
+    The file is written next to ``path`` and then moved over it, so readers
+    never see a partially written file.
+    """
+    order = np.argsort(keys, kind="stable")
+    keys = np.ascontiguousarray(keys[order], dtype=KEY_DTYPE)
+    wins = np.ascontiguousarray(wins[order], dtype=WINS_DTYPE)
+    visits = np.ascontiguousarray(visits[order], dtype=VISITS_DTYPE)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(keys)).astype(KEY_DTYPE).tobytes())
+        f.write(keys.tobytes())
+        f.write(wins.tobytes())
+        f.write(visits.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_knowledge(path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Opens a knowledge base file as three read-only memory-mapped arrays.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a knowledge base file.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or header[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a knowledge base file.")
+    n = int(np.frombuffer(header[len(MAGIC) :], dtype=KEY_DTYPE)[0])
+    if n == 0:
+        return (
+            np.empty(0, dtype=KEY_DTYPE),
+            np.empty(0, dtype=WINS_DTYPE),
+            np.empty(0, dtype=VISITS_DTYPE),
+        )
+
+    keys = np.memmap(path, dtype=KEY_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n,))
+    offset = HEADER_SIZE + n * KEY_DTYPE.itemsize
+    wins = np.memmap(path, dtype=WINS_DTYPE, mode="r", offset=offset, shape=(n,))
+    offset += n * WINS_DTYPE.itemsize
+    visits = np.memmap(path, dtype=VISITS_DTYPE, mode="r", offset=offset, shape=(n,))
+    return keys, wins, visits
+
+
+def segment_paths(path: str) -> list[str]:
+    """Delta segments of a knowledge base file, oldest first."""
+    numbers = []
+    for segment in glob.glob(f"{glob.escape(path)}.*.delta"):
+        n = segment[len(path) + 1 : -len(".delta")]
+        if n.isdigit():
+            numbers.append(int(n))
+    return [f"{path}.{n}.delta" for n in sorted(numbers)]
+
+
+def merge_files(
+    files: list[tuple[np.ndarray, np.ndarray, np.ndarray]],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Merges (keys, wins, visits) files into one sorted set, later files taking precedence."""
+    if len(files) == 1:
+        return files[0]
+    keys = np.concatenate([f[0] for f in reversed(files)])
+    # np.unique keeps the first occurrence, i.e. the entry of the newest file
+    keys, first = np.unique(keys, return_index=True)
+    wins = np.concatenate([f[1] for f in reversed(files)])[first]
+    visits = np.concatenate([f[2] for f in reversed(files)])[first]
+    return keys, wins, visits
+
+
+def prune(
+    keys: np.ndarray, wins: np.ndarray, visits: np.ndarray, min_visits: int, max_states: int | None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Drops the entries with fewer than ``min_visits`` visits, then keeps the ``max_states`` most visited."""
+    keep = visits >= min_visits
+    keys, wins, visits = keys[keep], wins[keep], visits[keep]
+    if max_states is not None and len(keys) > max_states:
+        top = np.argsort(-visits, kind="stable")[:max_states]
+        keys, wins, visits = keys[top], wins[top], visits[top]
+    return keys, wins, visits
+
+
+class KnowledgeBase:
+    """
+    Position statistics keyed by the canonical position key (see
+    ``canonical_key``), so a position and its mirror image share one entry.
+
+    Saved statistics live in sorted, memory-mapped files and are looked up by
+    binary search; the entries touched since the last save live in an in-memory
+    overlay of ``StateStats``. The mapping methods (``in``, ``[]``, ``get``,
+    ``len``, ``items``) work on the merged view, so the base can replace the
+    plain dict previously used by the policies.
+
+    The saved files are the base file and its delta segments
+    (``<path>.<n>.delta``, same format). ``checkpoint`` writes only the entries
+    changed since the last save to a new segment, whose entries take
+    precedence over older files; ``compact`` folds the segments back into the
+    base file, applying the pruning policy.
+
+    The mapped arrays are read-only and shared through ``load_asset`` by every
+    base opened on the same file in the process; the overlay is per instance.
+
+    With a ``capacity`` the overlay is bounded: once it holds more entries, the
+    least visited ones are evicted (a batch at a time, so the cost is amortized)
+    and their changes since the last save are lost. Low-visit entries are the
+    ones the pruning policy would drop anyway. ``hits``, ``misses``, ``inserts``
+    and ``evictions`` count the lookups and overlay changes.
+
+    Parameters
+    ----------
+    path : str, optional
+        Base file, an in-memory base when omitted.
+    capacity : int, optional
+        Maximum number of overlay entries, unbounded when omitted. ``items``
+        promotes every saved entry and ignores it.
+    """
+
+    def __init__(self, path: str | None = None, capacity: int | None = None):
+        self.path = path
+        self.capacity = capacity
+        self.overlay: dict[int, StateStats] = {}
+        self._new = 0  # Overlay entries that are not in the files
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._recount = False
+        self.compact_error: BaseException | None = None
+        empty = (
+            np.empty(0, dtype=KEY_DTYPE),
+            np.empty(0, dtype=WINS_DTYPE),
+            np.empty(0, dtype=VISITS_DTYPE),
+        )
+        # Base file first, then the delta segments
+        self.files: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = [empty]
+        self._segments: list[str] = []
+        if path is not None:
+            if os.path.exists(path):
+                self.files[0] = load_asset(path, read_knowledge)
+            self._segments = segment_paths(path)
+            self.files += [load_asset(p, read_knowledge) for p in self._segments]
+        self._saved = len(merge_files(self.files)[0])
+
+    @classmethod
+    def from_stats(cls, stats: dict[int, StateStats]) -> "KnowledgeBase":
+        """Builds an in-memory knowledge base from a dict of ``StateStats``."""
+        kb = cls()
+        kb.overlay = dict(stats)
+        kb._new = len(kb.overlay)
+        return kb
+
+    def _lookup(self, key: int) -> tuple[float, int] | None:
+        k = np.uint64(key)
+        for keys, wins, visits in reversed(self.files):
+            i = int(np.searchsorted(keys, k))
+            if i < len(keys) and int(keys[i]) == key:
+                return float(wins[i]), int(visits[i])
+        return None
+
+    def _saved_values(self, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized ``_lookup``: (found, wins, visits) of every key in the files."""
+        found = np.zeros(len(keys), dtype=bool)
+        wins = np.zeros(len(keys), dtype=np.float64)
+        visits = np.zeros(len(keys), dtype=np.int64)
+        # Oldest first, so newer files overwrite the values
+        for f_keys, f_wins, f_visits in self.files:
+            if not len(f_keys):
+                continue
+            idx = np.minimum(np.searchsorted(f_keys, keys), len(f_keys) - 1)
+            hit = f_keys[idx] == keys
+            found |= hit
+            wins[hit] = f_wins[idx[hit]]
+            visits[hit] = f_visits[idx[hit]]
+        return found, wins, visits
+
+    def _overlay_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n = len(self.overlay)
+        keys = np.fromiter(self.overlay.keys(), dtype=KEY_DTYPE, count=n)
+        wins = np.fromiter((s.wins for s in self.overlay.values()), dtype=np.float64, count=n)
+        visits = np.fromiter((s.visits for s in self.overlay.values()), dtype=np.int64, count=n)
+        return keys, wins, visits
+
+    def _insert(self, key: int, stats: StateStats) -> None:
+        self.overlay[key] = stats
+        self.inserts += 1
+        if self.capacity is not None and len(self.overlay) > self.capacity:
+            self._evict(key)
+
+    def _evict(self, keep: int) -> None:
+        """Evicts the least visited overlay entries, down to 7/8 of the capacity."""
+        # The entry being inserted is protected, it has not been updated yet
+        stats = self.overlay.pop(keep)
+        keys, _, visits = self._overlay_arrays()
+        n = len(keys) - max(0, self.capacity - self.capacity // 8 - 1)
+        if n > 0:
+            out = keys[np.argpartition(visits, n - 1)[:n]]
+            for key in out.tolist():
+                del self.overlay[key]
+            self.evictions += n
+            self._new -= int((~self._saved_values(out)[0]).sum())
+        self.overlay[keep] = stats
+
+    def get(self, key: int, default: StateStats | None = None) -> StateStats | None:
+        """
+        Returns the statistics of ``key``. Saved entries are copied into the
+        overlay on first access, so updating the returned object is kept.
+        """
+        stats = self.overlay.get(key)
+        if stats is not None:
+            self.hits += 1
+            return stats
+        saved = self._lookup(key)
+        if saved is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        stats = StateStats(*saved)
+        self._insert(key, stats)
+        return stats
+
+    def __getitem__(self, key: int) -> StateStats:
+        stats = self.get(key)
+        if stats is None:
+            raise KeyError(key)
+        return stats
+
+    def __setitem__(self, key: int, stats: StateStats) -> None:
+        if key in self.overlay:
+            self.overlay[key] = stats
+            return
+        if self._lookup(key) is None:
+            self._new += 1
+        self._insert(key, stats)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.overlay or self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        if self._recount:
+            # A compaction may have pruned saved entries that are in the overlay
+            keys = self._overlay_arrays()[0]
+            self._new = int((~self._saved_values(keys)[0]).sum())
+            self._recount = False
+        return self._saved + self._new
+
+    def items(self) -> Iterator[tuple[int, StateStats]]:
+        """Iterates over every entry, copying saved entries into the overlay."""
+        keys, wins, visits = merge_files(self.files)
+        for key, w, v in zip(keys.tolist(), wins.tolist(), visits.tolist()):
+            if key not in self.overlay:
+                self.overlay[key] = StateStats(w, v)
+        yield from self.overlay.items()
+
+    def to_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the merged entries as (keys, wins, visits) arrays, overlay first."""
+        keys, wins, visits = self._overlay_arrays()
+        saved_keys, saved_wins, saved_visits = merge_files(self.files)
+        # Saved entries shadowed by the overlay are dropped
+        keep = ~np.isin(saved_keys, keys)
+        return (
+            np.concatenate([keys, saved_keys[keep]]),
+            np.concatenate([wins, saved_wins[keep]]),
+            np.concatenate([visits, saved_visits[keep]]),
+        )
+
+    def delta(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the changes made since the files were opened, as (keys, wins, visits)
+        arrays: overlay statistics minus the saved ones, unchanged entries dropped.
+        """
+        keys, wins, visits = self._overlay_arrays()
+        _, saved_wins, saved_visits = self._saved_values(keys)
+        wins -= saved_wins
+        visits -= saved_visits
+        changed = (wins != 0) | (visits != 0)
+        return keys[changed], wins[changed], visits[changed]
+
+    def merge(self, keys: np.ndarray, wins: np.ndarray, visits: np.ndarray) -> None:
+        """Adds statistics deltas (e.g. from ``delta``) to the entries of this base."""
+        for key, w, v in zip(keys.tolist(), wins.tolist(), visits.tolist()):
+            stats = self.get(key)
+            if stats is None:
+                self[key] = StateStats(w, v)
+            else:
+                stats.wins += w
+                stats.visits += v
+
+    def checkpoint(self) -> int:
+        """
+        Writes the overlay entries changed since the last save to a new delta
+        segment and clears the overlay. The cost depends on the overlay only,
+        not on the size of the saved files.
+
+        Returns
+        -------
+        int
+            Number of entries written.
+        """
+        if self.path is None:
+            raise ValueError("No knowledge base file given.")
+
+        keys, wins, visits = self._overlay_arrays()
+        found, saved_wins, saved_visits = self._saved_values(keys)
+        changed = ~found | (wins != saved_wins) | (visits != saved_visits)
+        if changed.any():
+            with self._lock:
+                last = self._segments[-1] if self._segments else f"{self.path}.0.delta"
+                n = int(last[len(self.path) + 1 : -len(".delta")]) + 1
+                segment = f"{self.path}.{n}.delta"
+                write_knowledge(segment, keys[changed], wins[changed], visits[changed])
+                self._segments.append(segment)
+                self.files.append(load_asset(segment, read_knowledge))
+                self._saved += int((~found).sum())
+
+        self.overlay = {}
+        self._new = 0
+        return int(changed.sum())
+
+    def compact(self, min_visits: int = 0, max_states: int | None = None) -> int:
+        """
+        Folds the delta segments into the base file, keeping the entries allowed
+        by the pruning policy (see ``save``). The overlay is left untouched, and
+        segments written by ``checkpoint`` meanwhile are kept.
+
+        Returns
+        -------
+        int
+            Number of entries in the new base file.
+        """
+        if self.path is None:
+            raise ValueError("No knowledge base file given.")
+
+        with self._lock:
+            n_files = len(self.files)
+            segments = list(self._segments)
+        # Pruning copies the entries, so they stay valid once the files are released
+        keys, wins, visits = prune(*merge_files(self.files[:n_files]), min_visits, max_states)
+
+        with self._lock:
+            # Serve the compacted entries from memory and release the mappings
+            # before the files are replaced or removed, as in save()
+            self.files = [(keys, wins, visits)] + self.files[n_files:]
+            forget_asset(self.path)
+            write_knowledge(self.path, keys, wins, visits)
+            # Under the lock, so checkpoint() cannot reuse a name being removed
+            for segment in segments:
+                forget_asset(segment)
+                os.remove(segment)
+            self.files[0] = load_asset(self.path, read_knowledge)
+            self._segments = self._segments[len(segments) :]
+            self._saved = len(merge_files(self.files)[0])
+            self._recount = True
+        return len(keys)
+
+    def compact_async(self, min_visits: int = 0, max_states: int | None = None) -> threading.Thread:
+        """
+        Runs ``compact`` in a background thread and returns it. The thread is
+        not a daemon, so the interpreter waits for the compaction before exiting.
+
+        An exception raised by the compaction is stored in ``compact_error``
+        (None after a successful one) and reported by the thread.
+        """
+
+        def run() -> None:
+            self.compact_error = None
+            try:
+                self.compact(min_visits, max_states)
+            except BaseException as e:
+                self.compact_error = e
+                raise
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    @property
+    def segments(self) -> int:
+        """Number of delta segments waiting for compaction."""
+        return len(self._segments)
+
+    def save(
+        self, path: str | None = None, min_visits: int = 0, max_states: int | None = None
+    ) -> int:
+        """
+        Writes the merged entries to ``path`` as a single file and reopens it
+        memory-mapped. Delta segments of ``path`` are removed.
+
+        Parameters
+        ----------
+        path : str, optional
+            Destination file, the current file when omitted.
+        min_visits : int, optional
+            Entries with fewer visits are dropped.
+        max_states : int, optional
+            Only the most visited entries are kept beyond this size.
+
+        Returns
+        -------
+        int
+            Number of entries written.
+        """
+        path = path if path is not None else self.path
+        if path is None:
+            raise ValueError("No knowledge base file given.")
+
+        keys, wins, visits = prune(*self.to_arrays(), min_visits, max_states)
+
+        with self._lock:
+            # Release the current mapping before the file is replaced
+            mapped = self.files
+            self.files = []
+            forget_asset(path)
+            try:
+                write_knowledge(path, keys, wins, visits)
+            except OSError:
+                self.files = mapped
+                raise
+            del mapped
+
+            for segment in segment_paths(path):
+                forget_asset(segment)
+                os.remove(segment)
+            self.path = path
+            self.overlay = {}
+            self._new = 0
+            self._segments = []
+            self.files = [load_asset(path, read_knowledge)]
+            self._saved = len(keys)
+        return len(keys)
+
+
+def legacy_key(k: bytes | int) -> int:
+    """
+    Translates a legacy key (raw bytes of a 6x7 board) into the canonical position key.
+
+    Legacy boards were played with player 1 moving first, while the referee
+    has -1 move first, so the colours are swapped: the stats of a legacy
+    position land on the same position with the first mover's discs as -1.
+    Integer keys already follow the current convention and are kept.
+    """
+    if isinstance(k, int):
+        return canonical_key(k)[0]
+    board = np.frombuffer(k, dtype=np.int64)
+    if not np.isin(board, (-1, 0, 1)).all():
+        # Training boards were stored as float64
+        board = np.frombuffer(k, dtype=np.float64)
+    position, mask = board_to_bitboards(-board.reshape(6, 7), 1)
+    return canonical_key(position_key(position, mask, 1))[0]
+
+
+def convert_legacy(src: str, dst: str) -> int:
+    """
+    Converts a legacy gzip pickle ``{key: (wins, visits)}`` into a knowledge base
+    file, merging the statistics of mirrored positions.
+
+    Returns
+    -------
+    int
+        Number of entries written.
+    """
+    with gzip.open(src, "rb") as f:
+        raw_data = pickle.load(f)
+
+    stats: dict[int, StateStats] = {}
+    for k, (wins, visits) in raw_data.items():
+        key = legacy_key(k)
+        s = stats.setdefault(key, StateStats())
+        s.wins += wins
+        s.visits += visits
+    return KnowledgeBase.from_stats(stats).save(dst)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m connect4.knowledge <legacy.pkl.gz> <output.kb>")
+        sys.exit(1)
+    print(f"{convert_legacy(sys.argv[1], sys.argv[2])} states converted.")
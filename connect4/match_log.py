@@ -0,0 +1,141 @@
+# Types
+from typing import Iterator, Sequence, overload
+
+# Libraries
+import json
+
+from connect4.bitboard_state import BitboardState
+from connect4.dtos import Game, Match
+
+
+def replay(moves: list[int]) -> Game:
+    """
+    Rebuilds the state-action history of a game from its move sequence.
+
+    Parameters
+    ----------
+    moves : list[int]
+        Columns played, starting with the first player (-1).
+
+    Returns
+    -------
+    Game
+        ``(board, action)`` pairs, each board being the state before the action.
+    """
+    state = BitboardState()
+    game = Game()
+    for action in moves:
+        game.append((state.board.tolist(), action))
+        state = state.transition(action)
+    return game
+
+
+class MatchLogWriter:
+    """
+    Streams a match to a JSON Lines file, one record per line.
+
+    The first line holds the players, every finished game is appended as its
+    move sequence as soon as it ends, and the last line holds the result::
+
+        {"type": "match", "player_a": "...", "player_b": "..."}
+        {"type": "game", "first": "...", "winner": "...", "moves": [3, 3, 2]}
+        {"type": "result", "player_a_wins": 1, "player_b_wins": 0, "draws": 0, ...}
+    """
+
+    def __init__(self, path: str, player_a: str, player_b: str):
+        self.path = path
+        self._file = open(path, "w")
+        self._write({"type": "match", "player_a": player_a, "player_b": player_b})
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def write_game(self, moves: list[int], first: str, winner: str | None) -> None:
+        """Appends a finished game; ``winner`` is None for a draw."""
+        self._write({"type": "game", "first": first, "winner": winner, "moves": moves})
+
+    def close(self, match: Match) -> None:
+        """Writes the final result of ``match`` (without its games) and closes the file."""
+        record = {"type": "result"}
+        record.update(match.model_dump(mode="json", exclude={"player_a", "player_b", "games"}))
+        self._write(record)
+        self._file.close()
+
+    def __enter__(self) -> "MatchLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class LazyGames(Sequence[Game]):
+    """Sequence of games rebuilt from their move lists only when accessed."""
+
+    def __init__(self, moves: list[list[int]]):
+        self.moves = moves
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    @overload
+    def __getitem__(self, i: int) -> Game: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[Game]: ...
+
+    def __getitem__(self, i: int | slice) -> Game | list[Game]:
+        if isinstance(i, slice):
+            return [replay(moves) for moves in self.moves[i]]
+        return replay(self.moves[i])
+
+    def __iter__(self) -> Iterator[Game]:
+        for moves in self.moves:
+            yield replay(moves)
+
+
+def iter_games(path: str) -> Iterator[dict]:
+    """Yields the game records of a match log one by one, without loading the file."""
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "game":
+                yield record
+
+
+def load_match_log(path: str) -> Match:
+    """
+    Loads a match log written by ``MatchLogWriter``.
+
+    Only the move sequences are kept in memory; ``Match.games`` rebuilds the
+    boards of a game when it is accessed. An unfinished log (no result line)
+    is scored from its game records.
+    """
+    player_a = player_b = ""
+    moves: list[list[int]] = []
+    wins = {None: 0}
+    result = None
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "match":
+                player_a, player_b = record["player_a"], record["player_b"]
+                wins.update({player_a: 0, player_b: 0})
+            elif record["type"] == "game":
+                moves.append(record["moves"])
+                wins[record["winner"]] += 1
+            elif record["type"] == "result":
+                result = record
+
+    if result is None:
+        result = {
+            "player_a_wins": wins[player_a],
+            "player_b_wins": wins[player_b],
+            "draws": wins[None],
+        }
+    result.pop("type", None)
+    match = Match(player_a=player_a, player_b=player_b, **result)
+    # Assigned after validation, so the games stay lazy
+    match.games = LazyGames(moves)
+    return match
@@ -0,0 +1,673 @@
+# Types
+from typing import Callable
+
+# Libraries
+import math
+import random
+import time
+import numpy as np
+
+from connect4.bitboard_state import (
+    BOTTOM_MASKS,
+    COLS,
+    ROWS,
+    TOP_MASKS,
+    board_to_bitboards,
+    has_won,
+    mirror_key,
+    player_to_move,
+    position_key,
+    update_keys,
+)
+from connect4.dtos import PHASES
+
+C_UCB1 = 1.414  # Exploration constant for UCB1
+C_PUCT = 1.5  # Exploration constant for PUCT
+RAVE_K = 10.0  # Child visits at which RAVE weighs the AMAF and the own value equally
+
+
+def apply_move(position: int, mask: int, col: int) -> tuple[int, int]:
+    """
+    Plays ``col`` for the player to move on a (position, mask) bitboard pair.
+
+    Returns
+    -------
+    tuple[int, int]
+        Bitboards of the next position; ``position`` holds the discs of the
+        opponent, who is the next player to move.
+    """
+    return position ^ mask, mask | (mask + BOTTOM_MASKS[col])
+
+
+class Node:
+    """
+    Search tree node over bitboards.
+
+    ``player`` is the player to move in the node, ``wins`` are accumulated from
+    the point of view of the player who made the move leading to it (``-player``).
+    ``winner`` is None for non-terminal nodes, and -1, 1 or 0 (draw) otherwise;
+    it is also set on nodes whose game-theoretic result has been proven (see
+    ``propagate_proof``), which the search then treats as terminal.
+    ``key`` and ``mirror`` are the position keys of the node and of its mirror
+    image; children derive theirs from the parent's (see ``update_keys``).
+    ``amaf_wins``/``amaf_visits`` are all-moves-as-first statistics of the
+    move leading to the node, kept on the same scale as ``wins`` (see ``make_amaf``).
+    """
+
+    __slots__ = (
+        "position",
+        "mask",
+        "player",
+        "parent",
+        "action",
+        "children",
+        "untried",
+        "winner",
+        "wins",
+        "visits",
+        "key",
+        "mirror",
+        "amaf_wins",
+        "amaf_visits",
+    )
+
+    def __init__(
+        self,
+        position: int,
+        mask: int,
+        player: int,
+        parent: "Node | None" = None,
+        action: int | None = None,
+        winner: int | None = None,
+        keys: tuple[int, int] | None = None,
+    ):
+        self.position = position
+        self.mask = mask
+        self.player = player
+        self.parent = parent
+        self.action = action
+        self.children: list[Node] = []
+        if winner is None:
+            self.untried = [c for c in range(COLS) if not mask & TOP_MASKS[c]]
+            if not self.untried:
+                winner = 0
+        else:
+            self.untried = []
+        self.winner = winner
+        self.wins = 0.0
+        self.visits = 0
+        self.amaf_wins = 0.0
+        self.amaf_visits = 0
+        if keys is None:
+            key = position_key(position, mask, player)
+            keys = key, mirror_key(key)
+        self.key, self.mirror = keys
+
+    @property
+    def canonical_key(self) -> int:
+        """Key shared by the position and its mirror image (see ``canonical_key``)."""
+        return self.mirror if self.mirror < self.key else self.key
+
+    def expand(self) -> "Node":
+        """Creates the child of the last untried action."""
+        action = self.untried.pop()
+        position, mask = apply_move(self.position, self.mask, action)
+        winner = self.player if has_won(position ^ mask) else None
+        keys = update_keys(self.key, self.mirror, mask ^ self.mask, action, self.player)
+        child = Node(position, mask, -self.player, parent=self, action=action, winner=winner, keys=keys)
+        self.children.append(child)
+        return child
+
+
+def root_from_board(board: np.ndarray, player: int | None = None) -> Node:
+    """
+    Builds a search root from a (ROWS, COLS) board.
+
+    Parameters
+    ----------
+    board : np.ndarray
+        Board received by ``Policy.act``.
+    player : int, optional
+        Player to move, inferred from the disc count when omitted.
+
+    Returns
+    -------
+    Node
+        Root node, already marked as terminal if the board is finished.
+    """
+    if player is None:
+        player = player_to_move(board)
+    position, mask = board_to_bitboards(board, player)
+    winner = -player if has_won(position ^ mask) else None
+    return Node(position, mask, player, winner=winner)
+
+
+def advance_root(
+    previous: Node | None, board: np.ndarray, player: int | None = None, max_depth: int = 2
+) -> Node:
+    """
+    Reuses the subtree of a previous search that matches a new board.
+
+    Parameters
+    ----------
+    previous : Node | None
+        Root of the last search, or None.
+    board : np.ndarray
+        Board received by ``Policy.act``.
+    player : int, optional
+        Player to move, inferred from the disc count when omitted.
+    max_depth : int, optional
+        Plies searched below ``previous``; 2 covers our move and the opponent's reply.
+
+    Returns
+    -------
+    Node
+        Matching descendant detached from its parent, or a fresh root when the
+        board is not in the stored tree.
+    """
+    if player is None:
+        player = player_to_move(board)
+    position, mask = board_to_bitboards(board, player)
+
+    frontier = [previous] if previous is not None else []
+    for _ in range(max_depth + 1):
+        for node in frontier:
+            if node.mask == mask and node.position == position:
+                node.parent = None
+                node.action = None
+                return node
+        # Only discs are added, so descendants must be subsets of the new mask
+        frontier = [
+            child for node in frontier for child in node.children if child.mask & ~mask == 0
+        ]
+    return root_from_board(board, player)
+
+
+# --- Selection ---
+
+
+def ucb1(c: float = C_UCB1) -> Callable[[Node], Node]:
+    """Returns a UCB1 selection rule; unvisited children are always tried first."""
+
+    def select(node: Node) -> Node:
+        best = None
+        best_val = -math.inf
+        log_n = math.log(node.visits) if node.visits > 0 else 0.0
+        for child in node.children:
+            if child.visits == 0:
+                return child
+            val = child.wins / child.visits + c * math.sqrt(log_n / child.visits)
+            if val > best_val:
+                best_val = val
+                best = child
+        return best
+
+    return select
+
+
+def puct(
+    c: float = C_PUCT, prior: Callable[[Node, int], float] | None = None
+) -> Callable[[Node], Node]:
+    """
+    Returns a PUCT selection rule.
+
+    Parameters
+    ----------
+    c : float, optional
+        Exploration constant.
+    prior : Callable[[Node, int], float], optional
+        Prior probability of playing an action in a node; uniform when omitted.
+    """
+
+    def select(node: Node) -> Node:
+        best = None
+        best_val = -math.inf
+        sqrt_n = math.sqrt(node.visits)
+        uniform = 1.0 / len(node.children)
+        for child in node.children:
+            p = uniform if prior is None else prior(node, child.action)
+            q = child.wins / child.visits if child.visits else 0.0
+            val = q + c * p * sqrt_n / (1 + child.visits)
+            if val > best_val:
+                best_val = val
+                best = child
+        return best
+
+    return select
+
+
+def equivalence_schedule(k: float = RAVE_K) -> Callable[[int, int], float]:
+    """
+    RAVE blend ``beta = sqrt(k / (3 n + k))``: the AMAF value and the child's
+    own value weigh the same after ``k`` visits of the child.
+    """
+
+    def schedule(visits: int, amaf_visits: int) -> float:
+        return math.sqrt(k / (3 * visits + k))
+
+    return schedule
+
+
+def min_mse_schedule(bias: float = 0.1) -> Callable[[int, int], float]:
+    """
+    RAVE blend ``beta = m / (n + m + 4 bias^2 n m)`` for ``n`` visits and ``m``
+    AMAF visits, minimising the error of the blend when the AMAF value is off
+    by ``bias`` (on the scale of the rewards).
+    """
+    b2 = 4 * bias * bias
+
+    def schedule(visits: int, amaf_visits: int) -> float:
+        return amaf_visits / (visits + amaf_visits + b2 * visits * amaf_visits)
+
+    return schedule
+
+
+def rave(
+    c: float = C_UCB1, k: float = RAVE_K, schedule: Callable[[int, int], float] | None = None
+) -> Callable[[Node], Node]:
+    """
+    Returns a UCB1 selection rule over values blended with AMAF statistics.
+
+    Parameters
+    ----------
+    c : float, optional
+        Exploration constant.
+    k : float, optional
+        Parameter of the default blend, ``equivalence_schedule(k)``.
+    schedule : Callable[[int, int], float], optional
+        Weight of the AMAF value given the visits and AMAF visits of a child,
+        replacing the default blend (e.g. ``min_mse_schedule()``).
+
+    Notes
+    -----
+    Needs an ``MCTS`` built with ``amaf=make_amaf(...)`` to fill in the
+    statistics; without them it behaves as ``ucb1``. Connect4 moves are far
+    more position-dependent than Go moves, so small ``k`` values work best.
+    """
+
+    def select(node: Node) -> Node:
+        best = None
+        best_val = -math.inf
+        log_n = math.log(node.visits) if node.visits > 0 else 0.0
+        for child in node.children:
+            visits = child.visits
+            if visits == 0:
+                return child
+            q = child.wins / visits
+            if child.amaf_visits:
+                # Default schedule inlined, this runs for every child on every descent
+                beta = math.sqrt(k / (3 * visits + k)) if schedule is None else schedule(visits, child.amaf_visits)
+                q += beta * (child.amaf_wins / child.amaf_visits - q)
+            val = q + c * math.sqrt(log_n / visits)
+            if val > best_val:
+                best_val = val
+                best = child
+        return best
+
+    return select
+
+
+# --- Rollout ---
+
+
+def random_rollout(
+    position: int, mask: int, player: int, max_plies: int = ROWS * COLS, moves: list[int] | None = None
+) -> int:
+    """
+    Plays uniformly random moves from a position.
+
+    Parameters
+    ----------
+    position : int
+        Discs of the player to move.
+    mask : int
+        Every disc on the board.
+    player : int
+        Player to move.
+    max_plies : int, optional
+        Number of plies after which the game is scored as a draw.
+    moves : list[int], optional
+        Receives the columns played, for AMAF statistics.
+
+    Returns
+    -------
+    int
+        Winner of the simulated game (-1 or 1), or 0 for a draw.
+    """
+    free = [c for c in range(COLS) if not mask & TOP_MASKS[c]]
+    for _ in range(max_plies):
+        if not free:
+            return 0
+        i = int(random.random() * len(free))
+        col = free[i]
+        if moves is not None:
+            moves.append(col)
+        position ^= mask
+        mask |= mask + BOTTOM_MASKS[col]
+        if has_won(position ^ mask):
+            return player
+        if mask & TOP_MASKS[col]:
+            del free[i]
+        player = -player
+    return 0
+
+
+# --- Backup ---
+
+
+def make_backup(
+    win: float = 1.0,
+    loss: float = 0.0,
+    on_update: Callable[[Node, float], None] | None = None,
+) -> Callable[[Node, float], None]:
+    """
+    Returns a backup rule crediting each node from the point of view of its mover.
+
+    Parameters
+    ----------
+    win : float, optional
+        Reward of a won game; a draw is worth the midpoint between win and loss.
+    loss : float, optional
+        Reward of a lost game.
+    on_update : Callable[[Node, float], None], optional
+        Called with every updated node and the reward it received.
+
+    Notes
+    -----
+    The outcome is the expected winner in [-1, 1] (1 meaning player 1 wins),
+    so averaged results of several playouts can be backed up at once.
+    """
+    half = (win - loss) / 2
+
+    def backup(node: Node, outcome: float) -> None:
+        while node is not None:
+            reward = loss + half * (1 - outcome * node.player)
+            node.visits += 1
+            node.wins += reward
+            if on_update is not None:
+                on_update(node, reward)
+            node = node.parent
+
+    return backup
+
+
+def make_amaf(win: float = 1.0, loss: float = 0.0) -> Callable[[Node, list[int], float], None]:
+    """
+    Returns an all-moves-as-first update, to pass to ``MCTS`` with the same
+    rewards as its backup rule.
+
+    For every node on the path from the evaluated leaf to the root, each child
+    whose cell the node's player also filled later in the iteration, in the
+    tree or in the rollout, is credited with the outcome as if it had been
+    played first. Moves are told apart by cell rather than by column, since a
+    column means a different move at every height.
+    """
+    half = (win - loss) / 2
+
+    def amaf(node: Node, moves: list[int], outcome: float) -> None:
+        # Cells filled after ``node`` by each player, the rollout starting with ``node.player``
+        cells = {1: 0, -1: 0}
+        player = node.player
+        mask = node.mask
+        for col in moves:
+            filled = mask | (mask + BOTTOM_MASKS[col])
+            cells[player] |= filled ^ mask
+            mask = filled
+            player = -player
+        while node is not None:
+            if node.children:
+                own = cells[node.player]
+                reward = loss + half * (1 + outcome * node.player)
+                for child in node.children:
+                    if (child.mask ^ node.mask) & own:
+                        child.amaf_visits += 1
+                        child.amaf_wins += reward
+            parent = node.parent
+            if parent is not None:
+                cells[parent.player] |= node.mask ^ parent.mask
+            node = parent
+
+    return amaf
+
+
+def propagate_proof(node: Node) -> None:
+    """
+    Marks the ancestors of a node with a known ``winner`` as proven when
+    possible: a node is won for its player as soon as one child is, and decided
+    once every child is expanded and proven (draw if any child is a draw).
+    Proven nodes are not expanded any further.
+    """
+    parent = node.parent
+    while parent is not None and parent.winner is None:
+        if node.winner == parent.player:
+            parent.winner = parent.player
+        elif parent.untried or any(child.winner is None for child in parent.children):
+            return
+        elif any(child.winner == 0 for child in parent.children):
+            parent.winner = 0
+        else:
+            parent.winner = -parent.player
+        parent.untried = []
+        node, parent = parent, parent.parent
+
+
+def add_virtual_loss(node: Node, loss: float, sign: int = 1) -> None:
+    """
+    Adds (``sign=1``) or removes (``sign=-1``) a pending visit scored as ``loss``
+    on the path from ``node`` to the root, steering batched selections apart.
+    """
+    while node is not None:
+        node.visits += sign
+        node.wins += sign * loss
+        node = node.parent
+
+
+# --- Search ---
+
+
+class SearchStats:
+    """
+    Telemetry of one search, filled in when passed to ``MCTS``.
+
+    ``MCTS.search`` measures everything: iterations, nodes created, depth of
+    the selected leaves and the time spent in each phase (see ``PHASES``).
+    Drivers built on ``MCTS.descend`` (batched or leaf-parallel search) run
+    their own rollouts and backups: they record iterations, nodes, depths and
+    the selection and expansion times, and leave the rollout and backup times
+    at zero. ``kb_hits``/``kb_misses`` and ``root_visits`` are set by the
+    caller, which owns the knowledge base and the root.
+    """
+
+    __slots__ = ("iterations", "nodes", "max_depth", "depth_sum", "kb_hits", "kb_misses", "phase_time", "root_visits")
+
+    def __init__(self):
+        self.iterations = 0
+        self.nodes = 0
+        self.max_depth = 0
+        self.depth_sum = 0
+        self.kb_hits = 0
+        self.kb_misses = 0
+        self.phase_time = dict.fromkeys(PHASES, 0.0)
+        self.root_visits = [0] * COLS  # Visits of the root child of every column
+
+    @property
+    def mean_depth(self) -> float:
+        return self.depth_sum / self.iterations if self.iterations else 0.0
+
+    def record_root(self, root: Node) -> None:
+        """Stores the visit distribution over the children of ``root``."""
+        self.root_visits = [0] * COLS
+        for child in root.children:
+            self.root_visits[child.action] = child.visits
+
+
+class MCTS:
+    """
+    Monte Carlo Tree Search over bitboard nodes.
+
+    Parameters
+    ----------
+    select : Callable[[Node], Node], optional
+        Selection rule for fully expanded nodes (default UCB1).
+    rollout : Callable[[int, int, int], int], optional
+        Simulation from ``(position, mask, player)`` returning the winner.
+    backup : Callable[[Node, float], None], optional
+        Propagates an outcome from a leaf to the root (default ``make_backup()``).
+    on_expand : Callable[[Node], None], optional
+        Called with every newly created node, e.g. to seed it from stored knowledge.
+    batch : int, optional
+        Iterations run between two clock checks.
+    prove : Callable[[Node], int | None], optional
+        Called with every newly created non-terminal node; a returned winner
+        marks the node as proven (see ``connect4.solver.endgame_prover``).
+    stats : SearchStats, optional
+        Telemetry filled in by ``search``; without it the search loop runs
+        uninstrumented.
+    amaf : Callable[[Node, list[int], float], None], optional
+        AMAF update (see ``make_amaf``), called after every backup with the
+        columns played by the rollout, which must then accept a ``moves``
+        list. Used together with the ``rave`` selection rule; batched and
+        leaf-parallel searches do not report rollout moves and skip it.
+    """
+
+    def __init__(
+        self,
+        select: Callable[[Node], Node] | None = None,
+        rollout: Callable[[int, int, int], int] = random_rollout,
+        backup: Callable[[Node, float], None] | None = None,
+        on_expand: Callable[[Node], None] | None = None,
+        batch: int = 64,
+        prove: Callable[[Node], int | None] | None = None,
+        stats: SearchStats | None = None,
+        amaf: Callable[[Node, list[int], float], None] | None = None,
+    ):
+        self.select = select if select is not None else ucb1()
+        self.rollout = rollout
+        self.backup = backup if backup is not None else make_backup()
+        self.on_expand = on_expand
+        self.batch = batch
+        self.prove = prove
+        self.stats = stats
+        self.amaf = amaf
+
+    def expand(self, node: Node) -> Node:
+        """Creates a child of ``node`` and runs the expansion and proof hooks on it."""
+        node = node.expand()
+        if self.on_expand is not None:
+            self.on_expand(node)
+        if self.prove is not None and node.winner is None:
+            node.winner = self.prove(node)
+            if node.winner is not None:
+                node.untried = []
+        if node.winner is not None:
+            propagate_proof(node)
+        return node
+
+    def descend(self, root: Node) -> Node:
+        """Selects a leaf from ``root`` and expands it, returning the node to evaluate."""
+        stats = self.stats
+        if stats is not None:
+            t0 = time.perf_counter()
+        node = root
+        depth = 0
+        # 1. Selection (proven nodes are not searched further)
+        while node.winner is None and not node.untried and node.children:
+            node = self.select(node)
+            depth += 1
+        if stats is not None:
+            t1 = time.perf_counter()
+        # 2. Expansion
+        if node.winner is None and node.untried:
+            node = self.expand(node)
+            depth += 1
+            if stats is not None:
+                stats.nodes += 1
+        if stats is not None:
+            stats.phase_time["selection"] += t1 - t0
+            stats.phase_time["expansion"] += time.perf_counter() - t1
+            stats.iterations += 1
+            stats.depth_sum += depth
+            if depth > stats.max_depth:
+                stats.max_depth = depth
+        return node
+
+    def iterate(self, root: Node) -> None:
+        """Runs one selection, expansion, simulation and backup pass."""
+        node = self.descend(root)
+        stats = self.stats
+        if stats is not None:
+            t2 = time.perf_counter()
+        # 3. Simulation
+        moves = [] if self.amaf is not None else None
+        if node.winner is not None:
+            outcome = node.winner
+        elif moves is None:
+            outcome = self.rollout(node.position, node.mask, node.player)
+        else:
+            outcome = self.rollout(node.position, node.mask, node.player, moves=moves)
+        if stats is not None:
+            t3 = time.perf_counter()
+        # 4. Backup
+        self.backup(node, outcome)
+        if moves is not None:
+            self.amaf(node, moves, outcome)
+        if stats is not None:
+            stats.phase_time["rollout"] += t3 - t2
+            stats.phase_time["backup"] += time.perf_counter() - t3
+
+    def search(
+        self, root: Node, iterations: int | None = None, time_limit: float | None = None
+    ) -> int:
+        """
+        Runs iterations from ``root`` until one of the budgets is exhausted.
+
+        Parameters
+        ----------
+        root : Node
+            Root of the search tree, updated in place.
+        iterations : int, optional
+            Maximum number of iterations.
+        time_limit : float, optional
+            Wall-clock budget in seconds.
+
+        Returns
+        -------
+        int
+            Number of iterations completed.
+
+        Raises
+        ------
+        ValueError
+            If neither budget is given.
+        """
+        if iterations is None and time_limit is None:
+            raise ValueError("An iteration or time budget is required.")
+
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        iterate = self.iterate
+        done = 0
+        while iterations is None or done < iterations:
+            n = self.batch if iterations is None else min(self.batch, iterations - done)
+            for _ in range(n):
+                iterate(root)
+            done += n
+            if root.winner is not None:
+                break  # Proven, further iterations cannot change the choice
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return done
+
+
+def best_action(root: Node) -> int:
+    """
+    Returns the action of a proven winning child if any, else of the most
+    visited child not proven lost, or the first free column.
+    """
+    if not root.children:
+        free = [c for c in range(COLS) if not root.mask & TOP_MASKS[c]]
+        return free[0] if free else 0
+    for child in root.children:
+        if child.winner == root.player:
+            return child.action
+    candidates = [child for child in root.children if child.winner != -root.player]
+    return max(candidates or root.children, key=lambda child: child.visits).action
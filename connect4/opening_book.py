@@ -0,0 +1,164 @@
+# Libraries
+import multiprocessing as mp
+import os
+import random
+import sys
+import numpy as np
+
+from connect4.bitboard_state import COLS, TOP_MASKS, canonical_action, canonical_key, has_won, position_key
+from connect4.mcts import MCTS, Node, apply_move, best_action, make_backup, ucb1
+from connect4.utils import load_asset
+
+# File layout: MAGIC, entry count (uint64), then the sorted uint64 canonical
+# position keys and the uint8 book moves (in the canonical orientation).
+MAGIC = b"C4OB\x00\x00\x00\x01"
+HEADER_SIZE = len(MAGIC) + 8
+KEY_DTYPE = np.dtype("<u8")
+MOVE_DTYPE = np.dtype("u1")
+
+
+def write_book(path: str, keys: np.ndarray, moves: np.ndarray) -> None:
+    """Writes an opening book file sorted by key, through a temporary file."""
+    order = np.argsort(keys, kind="stable")
+    keys = np.ascontiguousarray(keys[order], dtype=KEY_DTYPE)
+    moves = np.ascontiguousarray(moves[order], dtype=MOVE_DTYPE)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(keys)).astype(KEY_DTYPE).tobytes())
+        f.write(keys.tobytes())
+        f.write(moves.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_book(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Opens an opening book file as two read-only memory-mapped arrays.
+
+    Raises
+    ------
+    ValueError
+        If the file is not an opening book file.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or header[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an opening book file.")
+    n = int(np.frombuffer(header[len(MAGIC) :], dtype=KEY_DTYPE)[0])
+    if n == 0:
+        return np.empty(0, dtype=KEY_DTYPE), np.empty(0, dtype=MOVE_DTYPE)
+
+    keys = np.memmap(path, dtype=KEY_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n,))
+    offset = HEADER_SIZE + n * KEY_DTYPE.itemsize
+    moves = np.memmap(path, dtype=MOVE_DTYPE, mode="r", offset=offset, shape=(n,))
+    return keys, moves
+
+
+class OpeningBook:
+    """
+    Read-only opening book mapping canonical position keys to moves.
+
+    The file is opened memory-mapped (and shared through ``load_asset``) on the
+    first lookup, so a policy can hold a book it may never consult; a missing
+    file behaves as an empty book.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._arrays: tuple[np.ndarray, np.ndarray] | None = None
+
+    def _load(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._arrays is None:
+            if os.path.exists(self.path):
+                self._arrays = load_asset(self.path, read_book)
+            else:
+                self._arrays = (np.empty(0, dtype=KEY_DTYPE), np.empty(0, dtype=MOVE_DTYPE))
+        return self._arrays
+
+    def __len__(self) -> int:
+        return len(self._load()[0])
+
+    def lookup(self, position: int, mask: int, player: int) -> int | None:
+        """Returns the book move of a position, or None if it is not in the book."""
+        keys, moves = self._load()
+        if not len(keys):
+            return None
+        key, mirrored = canonical_key(position_key(position, mask, player))
+        i = int(np.searchsorted(keys, np.uint64(key)))
+        if i < len(keys) and int(keys[i]) == key:
+            return canonical_action(int(moves[i]), mirrored)
+        return None
+
+
+def enumerate_positions(depth: int) -> list[tuple[int, int, int]]:
+    """
+    Lists the unfinished positions reachable in fewer than ``depth`` plies,
+    one per mirror pair, as ``(position, mask, player)``.
+    """
+    frontier = {canonical_key(0)[0]: (0, 0, -1)}
+    positions = []
+    for _ in range(depth):
+        positions.extend(frontier.values())
+        following = {}
+        for position, mask, player in frontier.values():
+            for col in range(COLS):
+                if mask & TOP_MASKS[col]:
+                    continue
+                child_position, child_mask = apply_move(position, mask, col)
+                if has_won(child_position ^ child_mask):
+                    continue
+                key = canonical_key(position_key(child_position, child_mask, -player))[0]
+                following.setdefault(key, (child_position, child_mask, -player))
+        frontier = following
+    return positions
+
+
+def _analyse(args: tuple) -> tuple[int, int]:
+    position, mask, player, iterations, seed = args
+    random.seed(seed)
+    root = Node(position, mask, player)
+    MCTS(select=ucb1(), backup=make_backup()).search(root, iterations=iterations)
+    key, mirrored = canonical_key(position_key(position, mask, player))
+    return key, canonical_action(best_action(root), mirrored)
+
+
+def build_book(path: str, depth: int = 4, iterations: int = 20000, workers: int | None = None) -> int:
+    """
+    Searches every position of the first ``depth`` plies and writes the book.
+
+    Parameters
+    ----------
+    path : str
+        Destination file.
+    depth : int, optional
+        Number of plies covered by the book.
+    iterations : int, optional
+        MCTS iterations spent on every position.
+    workers : int, optional
+        Processes searching positions in parallel, one per core when omitted.
+
+    Returns
+    -------
+    int
+        Number of positions in the book.
+    """
+    seed = random.getrandbits(32)
+    tasks = [
+        (position, mask, player, iterations, seed + i)
+        for i, (position, mask, player) in enumerate(enumerate_positions(depth))
+    ]
+    with mp.Pool(workers) as pool:
+        results = pool.map(_analyse, tasks, chunksize=1)
+    keys = np.array([key for key, _ in results], dtype=KEY_DTYPE)
+    moves = np.array([move for _, move in results], dtype=MOVE_DTYPE)
+    write_book(path, keys, moves)
+    return len(keys)
+
+
+if __name__ == "__main__":
+    if not 2 <= len(sys.argv) <= 5:
+        print("Usage: python -m connect4.opening_book <output.book> [depth] [iterations] [workers]")
+        sys.exit(1)
+    args = [int(a) for a in sys.argv[2:]]
+    print(f"{build_book(sys.argv[1], *args)} positions written.")
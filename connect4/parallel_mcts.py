@@ -0,0 +1,200 @@
+# Types
+from typing import Callable
+
+# Libraries
+import atexit
+import multiprocessing as mp
+import os
+import random
+import time
+from multiprocessing.pool import Pool
+
+from connect4.mcts import C_UCB1, MCTS, Node, add_virtual_loss, make_backup, random_rollout, ucb1
+
+# Worker pools shared by every policy of the process, keyed by worker count
+_POOLS: dict[int, Pool] = {}
+
+
+def get_pool(workers: int) -> Pool:
+    """
+    Returns the process pool with ``workers`` processes, creating it on first use.
+
+    The pool lives until the interpreter exits, so its spawn cost is paid once
+    per process instead of once per move or per game.
+    """
+    pool = _POOLS.get(workers)
+    if pool is None:
+        pool = mp.Pool(workers)
+        _POOLS[workers] = pool
+    return pool
+
+
+def close_pools() -> None:
+    """Terminates every pool created by ``get_pool``."""
+    for pool in _POOLS.values():
+        pool.terminate()
+    _POOLS.clear()
+
+
+atexit.register(close_pools)
+
+
+# --- Root parallelization ---
+
+
+def _root_worker(args: tuple) -> list[tuple[int, int, float]]:
+    position, mask, player, time_limit, seed, rollout, c, win, loss = args
+    # Forked workers share the parent's random state, each task gets its own seed
+    random.seed(seed)
+    root = Node(position, mask, player)
+    engine = MCTS(select=ucb1(c), rollout=rollout, backup=make_backup(win, loss))
+    engine.search(root, time_limit=time_limit)
+    return [(child.action, child.visits, child.wins) for child in root.children]
+
+
+def root_parallel_search(
+    pool: Pool,
+    root: Node,
+    workers: int,
+    time_limit: float,
+    rollout: Callable[[int, int, int], int] = random_rollout,
+    c: float = C_UCB1,
+    win: float = 1.0,
+    loss: float = 0.0,
+) -> dict[int, tuple[int, float]]:
+    """
+    Runs one independent search per worker and merges their root statistics.
+
+    Parameters
+    ----------
+    pool : Pool
+        Pool returned by ``get_pool``.
+    root : Node
+        Root of the search; its children receive the merged statistics.
+    workers : int
+        Number of independent searches.
+    time_limit : float
+        Wall-clock budget of every worker in seconds.
+    rollout : Callable[[int, int, int], int], optional
+        Module-level rollout function, it must be picklable.
+    c : float, optional
+        UCB1 exploration constant.
+    win, loss : float, optional
+        Rewards used by the backup, see ``make_backup``.
+
+    Returns
+    -------
+    dict[int, tuple[int, float]]
+        Merged ``(visits, wins)`` of every root action, as gathered by the workers.
+    """
+    if root.winner is not None:
+        return {}
+
+    seed = random.getrandbits(32)
+    tasks = [
+        (root.position, root.mask, root.player, time_limit, seed + i, rollout, c, win, loss)
+        for i in range(workers)
+    ]
+    merged: dict[int, tuple[int, float]] = {}
+    for stats in pool.map(_root_worker, tasks, chunksize=1):
+        for action, visits, wins in stats:
+            v, w = merged.get(action, (0, 0.0))
+            merged[action] = (v + visits, w + wins)
+
+    # Fold the merged statistics into the root so best_action() can be used
+    while root.untried:
+        root.expand()
+    for child in root.children:
+        visits, wins = merged.get(child.action, (0, 0.0))
+        child.visits += visits
+        child.wins += wins
+        root.visits += visits
+    return merged
+
+
+# --- Leaf parallelization ---
+
+
+def _leaf_worker(args: tuple) -> float:
+    rollout, position, mask, player, n, seed = args
+    random.seed(seed)
+    return sum(rollout(position, mask, player) for _ in range(n)) / n
+
+
+def leaf_parallel_search(
+    pool: Pool,
+    engine: MCTS,
+    root: Node,
+    time_limit: float,
+    workers: int,
+    leaves_per_worker: int = 8,
+    rollouts_per_leaf: int = 4,
+    virtual_loss: float = 0.0,
+) -> int:
+    """
+    Searches a single tree, evaluating batches of leaves in the worker pool.
+
+    Every selected leaf receives a virtual loss along its path, so the following
+    selections of the batch spread over different leaves. The virtual loss is
+    removed before the averaged rollout results are backed up.
+
+    Parameters
+    ----------
+    pool : Pool
+        Pool returned by ``get_pool``.
+    engine : MCTS
+        Engine providing the selection, rollout, backup and expansion hooks; its
+        rollout must be a picklable module-level function.
+    root : Node
+        Root of the search tree, updated in place.
+    time_limit : float
+        Wall-clock budget in seconds.
+    workers : int
+        Number of processes in ``pool``.
+    leaves_per_worker : int, optional
+        Leaves sent to each worker per batch.
+    rollouts_per_leaf : int, optional
+        Rollouts averaged for every leaf, amortizing the inter-process traffic.
+    virtual_loss : float, optional
+        Reward counted for a pending leaf, the loss reward of the backup.
+
+    Returns
+    -------
+    int
+        Number of leaves evaluated.
+
+    Notes
+    -----
+    Every batch pays for pickling the leaves and a round trip through the
+    pool, which costs far more than a cheap random rollout: on a single core
+    this evaluates about a quarter of the leaves sequential search does in the
+    same time. It only pays off with several cores and a costly rollout
+    (long or many ``rollouts_per_leaf``). With one worker or one core the
+    engine's sequential search is run instead.
+    """
+    if workers <= 1 or (os.cpu_count() or 1) <= 1:
+        return engine.search(root, time_limit=time_limit)
+
+    deadline = time.perf_counter() + time_limit
+    done = 0
+    while time.perf_counter() < deadline:
+        leaves = []
+        for _ in range(workers * leaves_per_worker):
+            node = engine.descend(root)
+            add_virtual_loss(node, virtual_loss, 1)
+            leaves.append(node)
+
+        seed = random.getrandbits(32)
+        tasks = [
+            (engine.rollout, n.position, n.mask, n.player, rollouts_per_leaf, seed + i)
+            for i, n in enumerate(leaves)
+            if n.winner is None
+        ]
+        outcomes = iter(pool.map(_leaf_worker, tasks, chunksize=leaves_per_worker))
+        for node in leaves:
+            add_virtual_loss(node, virtual_loss, -1)
+            engine.backup(node, node.winner if node.winner is not None else next(outcomes))
+        done += len(leaves)
+        if root.winner is not None:
+            break  # Proven, further batches cannot change the choice
+    return done
@@ -3,6 +3,10 @@ from abc import ABC, abstractmethod
 
 
 class Policy(ABC):
+    # Opt-in search telemetry: the referee sets collect_stats and reads last_stats
+    # (a connect4.mcts.SearchStats, or None if the move was not searched) after act()
+    collect_stats: bool = False
+    last_stats = None
 
     @abstractmethod
     def mount(self) -> None:
@@ -11,3 +15,7 @@ class Policy(ABC):
     @abstractmethod
     def act(self, s: np.ndarray) -> int:
         pass
+
+    def new_game(self) -> None:
+        """Called by the referee before every game of a match, after a single mount()."""
+        pass
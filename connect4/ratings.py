@@ -0,0 +1,137 @@
+# Libraries
+import numpy as np
+
+from connect4.dtos import Match
+
+ELO_SCALE = 400 / np.log(10)  # Elo points per unit of Bradley-Terry log-strength
+
+
+def bradley_terry(
+    wins: np.ndarray,
+    draws: np.ndarray | None = None,
+    prior: float = 1.0,
+    max_iter: int = 1000,
+    tol: float = 1e-9,
+) -> np.ndarray:
+    """
+    Fits Bradley-Terry strengths to a results matrix.
+
+    Uses the minorization-maximization updates of Hunter (2004), each one a
+    handful of array operations over the whole matrix.
+
+    Parameters
+    ----------
+    wins : np.ndarray
+        (N, N) matrix, ``wins[i, j]`` being the games ``i`` won against ``j``.
+    draws : np.ndarray, optional
+        (N, N) symmetric matrix of drawn games, each counted as half a win for
+        both players.
+    prior : float, optional
+        Virtual drawn games added between every pair of players, so that
+        undefeated or winless players keep a finite strength.
+    max_iter : int, optional
+        Maximum number of updates.
+    tol : float, optional
+        Largest change of a log-strength at which the fit stops.
+
+    Returns
+    -------
+    np.ndarray
+        Log-strengths with zero mean; ``i`` beats ``j`` with probability
+        ``1 / (1 + exp(s[j] - s[i]))``.
+    """
+    score = np.asarray(wins, dtype=np.float64)
+    if draws is not None:
+        score = score + 0.5 * np.asarray(draws, dtype=np.float64)
+    n = len(score)
+    score = score + (prior / 2) * (1 - np.eye(n))
+    games = score + score.T
+    won = score.sum(axis=1)
+
+    strength = np.ones(n)
+    log_strength = np.zeros(n)
+    for _ in range(max_iter):
+        strength = won / (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        new_log = np.log(strength)
+        new_log -= new_log.mean()
+        strength = np.exp(new_log)
+        done = np.abs(new_log - log_strength).max() < tol
+        log_strength = new_log
+        if done:
+            break
+    return log_strength
+
+
+def elo_ratings(
+    wins: np.ndarray, draws: np.ndarray | None = None, base: float = 1500.0, prior: float = 1.0
+) -> np.ndarray:
+    """Bradley-Terry fit of a results matrix expressed as Elo ratings averaging ``base``."""
+    return base + ELO_SCALE * bradley_terry(wins, draws, prior)
+
+
+def expected_scores(ratings: np.ndarray) -> np.ndarray:
+    """(N, N) matrix with the expected score of ``i`` against ``j`` under the Elo model."""
+    return 1 / (1 + 10 ** ((ratings[None, :] - ratings[:, None]) / 400))
+
+
+class RatingsTable:
+    """
+    Results of a league, accumulated match by match.
+
+    Only the win and draw counts of every pairing are stored, so memory does
+    not grow with the number of games played. Byes (see ``add_bye``) count
+    towards the points but not the games or the ratings, which only reflect
+    games actually played.
+
+    Parameters
+    ----------
+    names : list[str]
+        Names of the players.
+    """
+
+    def __init__(self, names: list[str]):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.wins = np.zeros((n, n), dtype=np.int64)
+        self.draws = np.zeros((n, n), dtype=np.int64)
+        self.byes = np.zeros(n, dtype=np.float64)  # Points awarded for byes
+
+    def add(self, match: Match) -> None:
+        """Adds the result counts of a match."""
+        i, j = self.index[match.player_a], self.index[match.player_b]
+        self.wins[i, j] += match.player_a_wins
+        self.wins[j, i] += match.player_b_wins
+        self.draws[i, j] += match.draws
+        self.draws[j, i] += match.draws
+
+    def add_bye(self, name: str, points: float) -> None:
+        """Awards ``points`` to a player sitting out a round."""
+        self.byes[self.index[name]] += points
+
+    def games(self) -> np.ndarray:
+        """Games played by every player."""
+        return (self.wins + self.wins.T + self.draws).sum(axis=1)
+
+    def points(self) -> np.ndarray:
+        """Points of every player, a win being worth 1, a draw 0.5, plus bye points."""
+        return self.wins.sum(axis=1) + 0.5 * self.draws.sum(axis=1) + self.byes
+
+    def played(self, a: str, b: str) -> bool:
+        """Whether two players have already met."""
+        i, j = self.index[a], self.index[b]
+        return bool(self.wins[i, j] + self.wins[j, i] + self.draws[i, j])
+
+    def ratings(self, base: float = 1500.0, prior: float = 1.0) -> dict[str, float]:
+        """Elo rating of every player, see ``elo_ratings``."""
+        elo = elo_ratings(self.wins, self.draws, base, prior)
+        return dict(zip(self.names, elo.tolist()))
+
+    def standings(self, base: float = 1500.0, prior: float = 1.0) -> list[tuple[str, float, float, int]]:
+        """``(name, rating, points, games)`` of every player, best rated first."""
+        elo = elo_ratings(self.wins, self.draws, base, prior)
+        points, games = self.points(), self.games()
+        order = np.argsort(-elo, kind="stable")
+        return [
+            (self.names[i], float(elo[i]), float(points[i]), int(games[i])) for i in order
+        ]
@@ -0,0 +1,231 @@
+# Types
+from typing import Callable
+
+# Libraries
+import time
+
+from connect4.bitboard_state import BOARD_MASK, BOTTOM, COL_HEIGHT, COLUMN_MASKS, COLS, ROWS, TOP_MASKS, has_won
+from connect4.mcts import Node
+
+CENTER_ORDER = (3, 2, 4, 1, 5, 0, 6)  # Central columns take part in more lines
+CELLS = ROWS * COLS
+
+# Transposition table entry flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class _Timeout(Exception):
+    pass
+
+
+def winning_cells(position: int, mask: int) -> int:
+    """
+    Returns the empty cells that would complete a line of four for the owner
+    of ``position``, whether they are playable yet or not.
+    """
+    # Vertical
+    r = (position << 1) & (position << 2) & (position << 3)
+    # Horizontal and both diagonals: the cell can be at either end or inside the line
+    for shift in (COL_HEIGHT, COL_HEIGHT - 1, COL_HEIGHT + 1):
+        p = (position << shift) & (position << (2 * shift))
+        r |= p & (position << (3 * shift))
+        r |= p & (position >> shift)
+        p = (position >> shift) & (position >> (2 * shift))
+        r |= p & (position << shift)
+        r |= p & (position >> (3 * shift))
+    return r & (BOARD_MASK ^ mask)
+
+
+def column_of(cell: int) -> int:
+    """Column of a single-bit cell."""
+    return (cell.bit_length() - 1) // COL_HEIGHT
+
+
+class Solver:
+    """
+    Exact Connect4 solver: negamax with alpha-beta pruning over bitboards.
+
+    Values are seen from the player to move: 1 for a win, 0 for a draw and -1
+    for a loss. The search plays immediate wins, restricts itself to moves that
+    do not hand the opponent an immediate win, tries the moves creating the
+    most threats first (center first on ties) and remembers results in a
+    transposition table kept between calls. Iterative deepening proves short
+    wins and losses quickly and seeds the move ordering of deeper passes.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Transposition table size; the table is cleared when it fills up.
+    """
+
+    def __init__(self, max_entries: int = 1 << 18):
+        self.table: dict[int, tuple[int, int, int, int | None]] = {}
+        self.max_entries = max_entries
+        self.nodes = 0
+        self._deadline: float | None = None
+        self._horizon = False  # Whether the current pass hit its depth limit
+
+    def _negamax(self, position: int, mask: int, depth: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if self._deadline is not None and not self.nodes & 1023 and time.perf_counter() > self._deadline:
+            raise _Timeout
+        if mask == BOARD_MASK:
+            return 0
+
+        possible = (mask + BOTTOM) & BOARD_MASK
+        if winning_cells(position, mask) & possible:
+            return 1
+        opponent = position ^ mask
+        threats = winning_cells(opponent, mask)
+        forced = possible & threats
+        if forced:
+            if forced & (forced - 1):
+                return -1  # Two threats cannot both be blocked
+            possible = forced
+        # Never play right below a cell where the opponent would win
+        possible &= ~(threats >> 1)
+        if not possible:
+            return -1
+
+        depth = min(depth, CELLS - mask.bit_count())
+        if depth == 0:
+            self._horizon = True
+            return 0
+
+        key = position + mask
+        entry = self.table.get(key)
+        best_col = None
+        if entry is not None:
+            e_depth, value, flag, best_col = entry
+            proven = value != 0 and (flag == EXACT or (flag == LOWER) == (value == 1))
+            if proven or e_depth >= depth:
+                if not proven and e_depth < CELLS - mask.bit_count():
+                    self._horizon = True
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value >= beta:
+                    return value
+                if flag == UPPER and value <= alpha:
+                    return value
+
+        moves = []
+        for i, col in enumerate(CENTER_ORDER):
+            move = possible & COLUMN_MASKS[col]
+            if move:
+                threats_made = winning_cells(position | move, mask | move).bit_count()
+                moves.append((col != best_col, -threats_made, i, col, move))
+        moves.sort()
+
+        alpha_orig = alpha
+        value = -1
+        best = None
+        for *_, col, move in moves:
+            v = -self._negamax(opponent, mask | move, depth - 1, -beta, -alpha)
+            if v > value:
+                value, best = v, col
+            if v > alpha:
+                alpha = v
+                if alpha >= beta:
+                    break
+
+        flag = UPPER if value <= alpha_orig else LOWER if value >= beta else EXACT
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        self.table[key] = (depth, value, flag, best)
+        return value
+
+    def solve(
+        self,
+        position: int,
+        mask: int,
+        time_limit: float | None = None,
+        max_depth: int | None = None,
+    ) -> int | None:
+        """
+        Solves a position by iterative deepening.
+
+        Parameters
+        ----------
+        position : int
+            Discs of the player to move.
+        mask : int
+            Every disc on the board.
+        time_limit : float, optional
+            Wall-clock budget in seconds.
+        max_depth : int, optional
+            Deepest pass in plies, the end of the game when omitted.
+
+        Returns
+        -------
+        int | None
+            The value for the player to move, or None if it could not be
+            proven within the budget.
+        """
+        if has_won(position ^ mask):
+            return -1
+        empty = CELLS - mask.bit_count()
+        last = empty if max_depth is None else min(max_depth, empty)
+        self._deadline = None if time_limit is None else time.perf_counter() + time_limit
+        try:
+            for depth in list(range(2, last, 2)) + [last]:
+                self._horizon = False
+                value = self._negamax(position, mask, depth, -1, 1)
+                if value != 0 or not self._horizon:
+                    return value
+        except _Timeout:
+            pass
+        finally:
+            self._deadline = None
+        return None
+
+    def best_move(
+        self, position: int, mask: int, time_limit: float | None = None
+    ) -> tuple[int | None, int | None]:
+        """
+        Solves a position and returns an optimal column with its value.
+
+        Returns
+        -------
+        tuple[int | None, int | None]
+            ``(column, value)``, or ``(None, None)`` if the position could not
+            be proven within the budget.
+        """
+        if has_won(position ^ mask):
+            return None, -1
+        possible = (mask + BOTTOM) & BOARD_MASK
+        if not possible:
+            return None, 0
+        wins = winning_cells(position, mask) & possible
+        if wins:
+            return column_of(wins & -wins), 1
+
+        value = self.solve(position, mask, time_limit)
+        if value is None:
+            return None, None
+        entry = self.table.get(position + mask)
+        if entry is not None and entry[3] is not None:
+            return entry[3], value
+        # Lost without search (double threat or no safe move): block what can be blocked
+        forced = possible & winning_cells(position ^ mask, mask)
+        if forced:
+            return column_of(forced & -forced), value
+        free = [c for c in CENTER_ORDER if not mask & TOP_MASKS[c]]
+        return free[0], value
+
+
+def endgame_prover(
+    solver: Solver, max_empty: int = 12, time_limit: float = 0.005
+) -> Callable[[Node], int | None]:
+    """
+    Returns an ``MCTS`` proof hook solving the nodes with at most ``max_empty``
+    empty cells, so the search marks them as proven wins, losses or draws.
+    """
+
+    def prove(node: Node) -> int | None:
+        if CELLS - node.mask.bit_count() > max_empty:
+            return None
+        value = solver.solve(node.position, node.mask, time_limit)
+        # Value of the player to move, turned into the winner
+        return None if value is None else value * node.player
+
+    return prove
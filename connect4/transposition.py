@@ -0,0 +1,255 @@
+# Types
+from typing import Callable, Container
+
+# Libraries
+import math
+import time
+
+from connect4.bitboard_state import BOARD_MASK, BOTTOM_MASKS, COLS, TOP_MASKS, has_won, position_key
+from connect4.mcts import C_UCB1, apply_move, random_rollout
+
+_GOLDEN = 0x9E3779B97F4A7C15  # Multiplier spreading position keys over the buckets
+_MASK64 = (1 << 64) - 1
+
+
+class Entry:
+    """Statistics of a position shared by every path that reaches it."""
+
+    __slots__ = ("key", "wins", "visits")
+
+    def __init__(self, key: int):
+        self.key = key
+        self.wins = 0.0
+        self.visits = 0
+
+
+class TranspositionTable:
+    """
+    Bounded hash table from position key to ``Entry``.
+
+    Every bucket holds two entries: a preferred slot that keeps the most visited
+    entry (the MCTS counterpart of the depth-preferred slot of alpha-beta tables)
+    and an always-replace slot that receives new positions. Memory therefore
+    never exceeds ``2 * buckets`` entries.
+
+    Parameters
+    ----------
+    size : int, optional
+        Maximum number of entries, rounded up to a power of two.
+    """
+
+    def __init__(self, size: int = 1 << 18):
+        self.bits = max(1, (size - 1).bit_length() - 1)
+        self.buckets = 1 << self.bits
+        self.slots: list[Entry | None] = [None] * (2 * self.buckets)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self.slots)
+
+    def _index(self, key: int) -> int:
+        return (((key * _GOLDEN) & _MASK64) >> (64 - self.bits)) << 1
+
+    def get(self, key: int) -> Entry | None:
+        i = self._index(key)
+        slots = self.slots
+        entry = slots[i]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        entry = slots[i + 1]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def insert(self, key: int, protected: Container[int] = ()) -> Entry:
+        """
+        Stores a fresh entry for ``key`` in the always-replace slot.
+
+        In a full bucket the more visited of the two entries stays, in the
+        preferred slot, and the other one is dropped, unless its key is in
+        ``protected`` (e.g. the positions of the path being backed up): then
+        the other one is dropped instead. If both are protected the new entry
+        is returned without being stored.
+        """
+        i = self._index(key)
+        slots = self.slots
+        preferred, replace = slots[i], slots[i + 1]
+        entry = Entry(key)
+        if preferred is None:
+            slots[i] = entry
+            return entry
+        if replace is not None:
+            keep, drop = (replace, preferred) if replace.visits > preferred.visits else (preferred, replace)
+            if drop.key in protected:
+                if keep.key in protected:
+                    return entry
+                keep, drop = drop, keep
+            self.evictions += 1
+            slots[i] = keep
+        slots[i + 1] = entry
+        return entry
+
+    def clear(self) -> None:
+        self.slots = [None] * (2 * self.buckets)
+
+
+class TranspositionMCTS:
+    """
+    Monte Carlo search over a directed acyclic graph of positions.
+
+    Node statistics live in a ``TranspositionTable``, and child lookups go through
+    it, so a position reached by different move orders is searched once and its
+    statistics are shared by every path. Evicted positions are simply expanded
+    again when they are reached. The table can be kept between moves, which also
+    carries the statistics of the subtree that was actually played.
+
+    Parameters
+    ----------
+    table : TranspositionTable
+        Table holding the statistics.
+    c : float, optional
+        UCB1 exploration constant.
+    rollout : Callable[[int, int, int], int], optional
+        Simulation from ``(position, mask, player)`` returning the winner.
+    win, loss : float, optional
+        Rewards of a won and a lost game, a draw being worth their midpoint.
+    batch : int, optional
+        Iterations run between two clock checks.
+    """
+
+    def __init__(
+        self,
+        table: TranspositionTable,
+        c: float = C_UCB1,
+        rollout: Callable[[int, int, int], int] = random_rollout,
+        win: float = 1.0,
+        loss: float = 0.0,
+        batch: int = 64,
+    ):
+        self.table = table
+        self.c = c
+        self.rollout = rollout
+        self.loss = loss
+        self.half = (win - loss) / 2
+        self.batch = batch
+
+    def _root_entry(self, position: int, mask: int, player: int) -> Entry:
+        key = position_key(position, mask, player)
+        entry = self.table.get(key)
+        return entry if entry is not None else self.table.insert(key)
+
+    def iterate(self, root: Entry, position: int, mask: int, player: int) -> None:
+        """Runs one selection, expansion, simulation and backup pass from the root."""
+        get = self.table.get
+        c = self.c
+        path = [(root, player)]
+        while True:
+            if mask & BOARD_MASK == BOARD_MASK:
+                outcome = 0
+                break
+
+            # Look up every child in the table, the first missing one is expanded
+            children = []
+            missing = None
+            for col in range(COLS):
+                if mask & TOP_MASKS[col]:
+                    continue
+                child_position, child_mask = position ^ mask, mask | (mask + BOTTOM_MASKS[col])
+                # position_key(child_position, child_mask, -player)
+                key = (child_position if player == -1 else child_position ^ child_mask) + child_mask
+                child = get(key)
+                if child is None:
+                    missing = (key, child_position, child_mask)
+                    break
+                children.append((child, child_position, child_mask))
+
+            if missing is not None:
+                key, position, mask = missing
+                # The entries of the path are still being updated: never evict them
+                path.append((self.table.insert(key, {entry.key for entry, _ in path}), -player))
+                if has_won(position ^ mask):
+                    outcome = player
+                else:
+                    outcome = self.rollout(position, mask, -player)
+                break
+
+            # UCB1 with the visits of the children, since the entry itself is
+            # also visited through other parents
+            log_n = math.log(max(1, sum(child.visits for child, _, _ in children)))
+            best = None
+            best_val = -math.inf
+            for item in children:
+                child = item[0]
+                if child.visits == 0:
+                    best = item
+                    break
+                val = child.wins / child.visits + c * math.sqrt(log_n / child.visits)
+                if val > best_val:
+                    best_val = val
+                    best = item
+
+            entry, position, mask = best
+            path.append((entry, -player))
+            if has_won(position ^ mask):
+                outcome = player
+                break
+            player = -player
+
+        # Each entry is credited from the point of view of the player who moved into it
+        loss = self.loss
+        half = self.half
+        for entry, to_move in path:
+            entry.visits += 1
+            entry.wins += loss + half * (1 - outcome * to_move)
+
+    def search(
+        self,
+        position: int,
+        mask: int,
+        player: int,
+        iterations: int | None = None,
+        time_limit: float | None = None,
+    ) -> int:
+        """
+        Searches from a position and returns the most visited action.
+
+        Raises
+        ------
+        ValueError
+            If neither budget is given.
+        """
+        if iterations is None and time_limit is None:
+            raise ValueError("An iteration or time budget is required.")
+
+        # The root is held here, so it survives even if the table evicts it
+        root = self._root_entry(position, mask, player)
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        done = 0
+        while iterations is None or done < iterations:
+            n = self.batch if iterations is None else min(self.batch, iterations - done)
+            for _ in range(n):
+                self.iterate(root, position, mask, player)
+            done += n
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return self.best_action(position, mask, player)
+
+    def best_action(self, position: int, mask: int, player: int) -> int:
+        """Returns the free column whose child position has the most visits."""
+        best_action = None
+        best_visits = -1
+        for col in range(COLS):
+            if mask & TOP_MASKS[col]:
+                continue
+            child_position, child_mask = apply_move(position, mask, col)
+            child = self.table.get(position_key(child_position, child_mask, -player))
+            visits = child.visits if child is not None else 0
+            if visits > best_visits:
+                best_visits = visits
+                best_action = col
+        return best_action if best_action is not None else 0
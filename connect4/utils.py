@@ -1,8 +1,14 @@
+import os
+import ast
 import sys
+import json
 import pathlib
 import inspect
 import importlib
-from typing import Type
+from typing import Any, Callable, Type
+
+# Read-only assets shared by every policy instance of the process: path -> (mtime, asset)
+_ASSETS: dict[str, tuple[int, Any]] = {}
 
 
 def find_importable_classes(folder_route: str, base_class: Type) -> dict[str, Type]:
@@ -25,3 +31,133 @@ def find_importable_classes(folder_route: str, base_class: Type) -> dict[str, Ty
             continue
 
     return candidates
+
+
+class LazyClass:
+    """
+    Stand-in for a class found by ``discover_classes``.
+
+    Calling it imports the module on first use and constructs an instance, so
+    a participant is only imported when it is first scheduled. It pickles as
+    its module and class names, so process workers import it themselves.
+    """
+
+    def __init__(self, module: str, name: str, root: str):
+        self.module = module
+        self.name = name
+        self.root = root
+        self._cls: Type | None = None
+
+    def load(self) -> Type:
+        """Imports and returns the class."""
+        if self._cls is None:
+            if self.root not in sys.path:
+                sys.path.insert(0, self.root)
+            self._cls = getattr(importlib.import_module(self.module), self.name)
+        return self._cls
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.load()(*args, **kwargs)
+
+    def __reduce__(self) -> tuple:
+        return LazyClass, (self.module, self.name, self.root)
+
+    def __repr__(self) -> str:
+        return f"LazyClass({self.module}.{self.name})"
+
+
+def subclass_names(tree: ast.Module, base_name: str) -> list[str]:
+    """
+    Names of the top-level classes of a parsed module deriving from
+    ``base_name``, directly or through other classes of the same module.
+    """
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+    known = {base_name}
+    found = []
+    changed = True
+    while changed:
+        changed = False
+        for cls in classes:
+            if cls.name in known:
+                continue
+            for base in cls.bases:
+                name = base.id if isinstance(base, ast.Name) else getattr(base, "attr", None)
+                if name in known:
+                    known.add(cls.name)
+                    found.append(cls.name)
+                    changed = True
+                    break
+    return found
+
+
+def discover_classes(folder_route: str, base_class: Type) -> dict[str, LazyClass]:
+    """
+    Finds the subclasses of ``base_class`` under a folder without importing it.
+
+    Like ``find_importable_classes``, results are keyed by the folder right
+    below ``folder_route`` (the last class found wins), but the sources are
+    only parsed, and the result is cached in ``__pycache__/discovery.json``
+    until a file is added, removed or modified.
+
+    Returns
+    -------
+    dict[str, LazyClass]
+        Classes that import their module the first time they are called.
+    """
+    folder_path = pathlib.Path(folder_route).resolve()
+    project_root = folder_path.parents[0]
+    files = sorted(folder_path.rglob("*.py"))
+    mtimes = {str(f.relative_to(folder_path)): f.stat().st_mtime_ns for f in files}
+
+    cache_path = folder_path / "__pycache__" / "discovery.json"
+    cache = None
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if cache is not None and cache.get("base") == base_class.__name__ and cache.get("files") == mtimes:
+        found = cache["classes"]
+    else:
+        found = []
+        for py_file in files:
+            rel_path = py_file.relative_to(project_root).with_suffix("")
+            module_name = ".".join(rel_path.parts)
+            try:
+                tree = ast.parse(py_file.read_bytes(), filename=str(py_file))
+            except (SyntaxError, ValueError):
+                continue
+            for name in subclass_names(tree, base_class.__name__):
+                found.append((module_name.split(".")[1], module_name, name))
+        try:
+            cache_path.parent.mkdir(exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump({"base": base_class.__name__, "files": mtimes, "classes": found}, f)
+        except OSError:
+            pass
+
+    return {key: LazyClass(module, name, str(project_root)) for key, module, name in found}
+
+
+def load_asset(path: str, loader: Callable[[str], Any]) -> Any:
+    """
+    Loads a read-only asset once per process.
+
+    The asset is cached by absolute path and reloaded only when the file's
+    modification time changes, so policies constructed for every match share
+    a single copy. Callers must not mutate the returned object.
+    """
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _ASSETS.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    asset = loader(path)
+    _ASSETS[path] = (mtime, asset)
+    return asset
+
+
+def forget_asset(path: str) -> None:
+    """Drops the cached copy of an asset, e.g. before its file is rewritten."""
+    _ASSETS.pop(os.path.abspath(path), None)
@@ -0,0 +1,116 @@
+# Libraries
+import numpy as np
+
+from connect4.batched import CELL_BITS, FULL, TOPS, has_won_batch, legal_mask_batch, play_batch
+from connect4.bitboard_state import COLS
+
+
+class VectorEnv:
+    """
+    N Connect4 games stored as arrays of bitboards and stepped together.
+
+    Every method works on all games at once, so self-play and evaluation can
+    drive thousands of games per Python call. Red (-1) moves first in every
+    game, as in ``ConnectState``.
+
+    Parameters
+    ----------
+    n : int
+        Number of simultaneous games.
+    auto_reset : bool, optional
+        Whether a game that ends is replaced by a new one within the same
+        ``step``. Otherwise finished games stay final and ignore their actions
+        until ``reset`` is called.
+    """
+
+    def __init__(self, n: int, auto_reset: bool = True):
+        self.n = n
+        self.auto_reset = auto_reset
+        self.position = np.zeros(n, dtype=np.uint64)  # Discs of the player to move
+        self.mask = np.zeros(n, dtype=np.uint64)
+        self.player = np.full(n, -1, dtype=np.int8)
+        self.plies = np.zeros(n, dtype=np.int64)  # Discs on every board
+        self.done = np.zeros(n, dtype=bool)
+        self._winners = np.zeros(n, dtype=np.int8)
+
+    def reset(self, indices: np.ndarray | None = None) -> None:
+        """Starts new games, all of them or only the given ones."""
+        if indices is None:
+            indices = slice(None)
+        self.position[indices] = 0
+        self.mask[indices] = 0
+        self.player[indices] = -1
+        self.plies[indices] = 0
+        self.done[indices] = False
+        self._winners[indices] = 0
+
+    def legal_mask(self) -> np.ndarray:
+        """(N, COLS) boolean array of the playable columns, all False in finished games."""
+        return legal_mask_batch(self.mask) & ~self.done[:, None]
+
+    def winners(self) -> np.ndarray:
+        """
+        int8 winner of every finished game (-1 or 1), 0 while running or for a
+        draw. With ``auto_reset`` games never stay finished, use the result of
+        ``step`` instead.
+        """
+        return self._winners.copy()
+
+    def boards(self) -> np.ndarray:
+        """(N, ROWS, COLS) int8 boards in the ``ConnectState.board`` layout."""
+        ones = np.where(self.player == 1, self.position, self.position ^ self.mask)
+        occupied = (self.mask[:, None, None] & CELL_BITS) != 0
+        red = (ones[:, None, None] & CELL_BITS) == 0
+        return np.where(occupied, np.where(red, -1, 1), 0).astype(np.int8)
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Plays one move in every running game.
+
+        Parameters
+        ----------
+        actions : np.ndarray
+            Column to play in every game; ignored in finished games.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The winner of every game that ended with this move (0 elsewhere or
+            for a draw) and the boolean mask of those games. With
+            ``auto_reset`` these games already hold a new initial position.
+
+        Raises
+        ------
+        ValueError
+            If a running game is asked to play a full column.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        running = np.flatnonzero(~self.done)
+        cols = actions[running]
+        if ((cols < 0) | (cols >= COLS)).any() or (self.mask[running] & TOPS[cols]).any():
+            raise ValueError("Illegal action in a running game.")
+
+        position, mask = play_batch(self.position[running], self.mask[running], cols)
+        won = has_won_batch(position ^ mask)
+        ended = won | ((mask & FULL) == FULL)
+
+        winners = np.zeros(self.n, dtype=np.int8)
+        winners[running[won]] = self.player[running[won]]
+        dones = np.zeros(self.n, dtype=bool)
+        dones[running[ended]] = True
+
+        self.position[running] = position
+        self.mask[running] = mask
+        self.player[running] = -self.player[running]
+        self.plies[running] += 1
+        self._winners[dones] = winners[dones]
+        self.done |= dones
+        if self.auto_reset:
+            self.reset(dones)
+        return winners, dones
+
+    def random_actions(self, rng: np.random.Generator | None = None) -> np.ndarray:
+        """A uniformly random legal column for every game (0 in finished games)."""
+        if rng is None:
+            rng = np.random.default_rng()
+        return np.argmax(rng.random((self.n, COLS)) * self.legal_mask(), axis=1)
@@ -0,0 +1,42 @@
+# Libraries
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def show_board(board: np.ndarray, size: int = 1500, ax: plt.Axes | None = None) -> None:
+    """
+    Draws a board with matplotlib.
+
+    Kept apart from the state classes so that matplotlib is only imported
+    when something is actually drawn.
+
+    Parameters
+    ----------
+    board : np.ndarray
+        Board with -1 (red) and 1 (yellow) discs, row 0 being the top.
+    size : int, optional
+        Marker size of the discs.
+    ax : plt.Axes, optional
+        Axes to draw on; a new figure is created and shown when omitted.
+    """
+    if ax is None:
+        fig, ax = plt.subplots()
+    else:
+        fig = None
+
+    pos_red = np.where(board == -1)
+    pos_yellow = np.where(board == 1)
+
+    ax.scatter(pos_yellow[1] + 0.5, 5.5 - pos_yellow[0], color="yellow", s=size)
+    ax.scatter(pos_red[1] + 0.5, 5.5 - pos_red[0], color="red", s=size)
+
+    ax.set_ylim([0, board.shape[0]])
+    ax.set_xlim([0, board.shape[1]])
+    ax.set_xticks(np.arange(board.shape[1] + 1))
+    ax.set_yticks(np.arange(board.shape[0] + 1))
+    ax.grid(True)
+
+    ax.set_title("Connect Four")
+
+    if fig is not None:
+        plt.show()
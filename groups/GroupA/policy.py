@@ -1,247 +1,261 @@
 import numpy as np
-import math
-import time
 import pickle
+import random
 import os
-import gzip
+import time
+import warnings
 from connect4.policy import Policy
+from connect4.bitboard_state import TOP_MASKS, board_to_bitboards, has_won, player_to_move
+from connect4.knowledge import KnowledgeBase, StateStats, convert_legacy
+from connect4.mcts import (
+    MCTS, SearchStats, advance_root, apply_move, best_action, make_amaf, make_backup, rave,
+    root_from_board, ucb1,
+)
+from connect4.batched import batched_search
+from connect4.parallel_mcts import get_pool, leaf_parallel_search, root_parallel_search
+from connect4.solver import Solver, endgame_prover
+from connect4.opening_book import OpeningBook
 from typing import override
 
 C_PARAM = 1.414  # Constante de exploración para UCB1
+KB_CAPACITY = 500_000  # Máximo de estados de la base de conocimiento en memoria
+SOLVER_EMPTY = 16  # Con estas casillas vacías o menos decide el solver exacto
+PROOF_EMPTY = 12  # Nodos del árbol MCTS que se intentan resolver de forma exacta
 
-class StateStats:
-    """
-    Clase para almacenar estadísticas de un estado específico.
-    """
-    __slots__ = ['wins', 'visits']
-    def __init__(self, wins=0.0, visits=0):
-        self.wins = wins
-        self.visits = visits
-
-class Node:
-    """
-    Representa un nodo en el árbol de búsqueda MCTS.
-    Almacena el estado del tablero, estadísticas de victorias/visitas y la estructura del árbol.
-    """
-    __slots__ = ['state', 'player', 'parent', 'action', 'children', 'untried', 'wins', 'visits']
-    def __init__(self, state, player, parent=None, action=None):
-        self.state = state
-        self.player = player
-        self.parent = parent
-        self.action = action
-        self.children = []
-        # Identificar columnas válidas (no llenas) para expansión futura
-        self.untried = [c for c in range(7) if state[0, c] == 0]
-        self.wins = 0.0
-        self.visits = 0
-
-    def expand(self):
-        """
-        Expande el árbol creando un nuevo nodo hijo a partir de una acción no probada.
-        """
-        action = self.untried.pop()
-        next_state = apply_move(self.state, action, self.player)
-        # El nuevo nodo tendrá el turno del jugador opuesto
-        child_node = Node(next_state, -self.player, parent=self, action=action)
-        self.children.append(child_node)
-        return child_node
-
-    def best_child(self):
-        """
-        Selecciona el mejor nodo hijo utilizando la fórmula de UCB1.
-        
-        """
-        best = None
-        best_val = -float('inf')
-        # Evitar error log(0) si es la primera visita al padre (caso borde)
-        log_n = math.log(self.visits) if self.visits > 0 else 0
-        
-        for child in self.children:
-            # Prioridad absoluta a nodos no visitados para evitar división por cero
-            if child.visits == 0: return child
-            
-            ucb = (child.wins / child.visits) + C_PARAM * math.sqrt(log_n / child.visits)
-            if ucb > best_val:
-                best_val = ucb
-                best = child
-        return best
-
-    def update(self, reward):
-        """Actualiza las estadísticas del nodo tras una simulación."""
-        self.visits += 1
-        self.wins += reward
-
-
-def apply_move(state, col, p):
-    """Aplica una jugada en la columna dada y retorna el nuevo estado del tablero."""
-    b = state.copy()
-    # Iterar de abajo hacia arriba para encontrar la primera celda vacía
-    for r in range(5, -1, -1):
-        if b[r, col] == 0:
-            b[r, col] = p
-            return b
-    return b
-
-def check_win(b, p):
-    """Verifica si el jugador p ha ganado en horizontal, vertical o diagonal."""
-    # Horizontal
-    for r in range(6):
-        for c in range(4):
-            if b[r,c]==p and b[r,c+1]==p and b[r,c+2]==p and b[r,c+3]==p: return True
-    # Vertical
-    for c in range(7):
-        for r in range(3):
-            if b[r,c]==p and b[r+1,c]==p and b[r+2,c]==p and b[r+3,c]==p: return True
-    # Diagonal principal
-    for r in range(3):
-        for c in range(4):
-            if b[r,c]==p and b[r+1,c+1]==p and b[r+2,c+2]==p and b[r+3,c+3]==p: return True
-            if b[r+3,c]==p and b[r+2,c+1]==p and b[r+1,c+2]==p and b[r,c+3]==p: return True
-    return False
-
-def fast_rollout(state, player):
+def fast_rollout(position, mask, player, moves=None):
     """
     Ejecuta una simulación aleatoria rápida (Rollout) desde el estado actual.
     Limita la profundidad a 20 movimientos para optimizar tiempo de cómputo.
+    Si se recibe `moves`, se le añaden las columnas jugadas (para RAVE).
     """
-    b = state.copy()
-    curr = player
+    valid = [c for c in range(7) if not mask & TOP_MASKS[c]]
     for _ in range(20): 
-        valid = [c for c in range(7) if b[0, c] == 0]
         if not valid: return 0 # Empate
         
         # Selección aleatoria uniforme de movimiento válido
-        move = valid[np.random.randint(len(valid))]
-        for r in range(5, -1, -1):
-            if b[r, move] == 0:
-                b[r, move] = curr
-                break
+        i = int(random.random() * len(valid))
+        move = valid[i]
+        if moves is not None: moves.append(move)
+        position, mask = apply_move(position, mask, move)
         
-        if check_win(b, curr): return curr
-        curr = -curr
+        # Solo el jugador que acaba de mover puede haber ganado
+        if has_won(position ^ mask): return player
+        # Columna llena: deja de ser válida
+        if mask & TOP_MASKS[move]: del valid[i]
+        player = -player
     return 0
 
 # --- Motor de Búsqueda MCTS ---
 
-def run_mcts(root_state, player, time_limit, knowledge_base):
+def run_mcts(root_state, player, time_limit, knowledge_base, root=None, pool=None, workers=1, parallel="root", batched=False, prove=None, stats=None, rave_k=None):
     """
     Ejecuta el algoritmo Monte Carlo Tree Search dentro del límite de tiempo establecido.
     Integra conocimiento persistente (knowledge_base) para inicializar nodos conocidos.
+    Si se recibe `root` (subárbol reutilizado de la jugada anterior) se continúa su búsqueda.
+    Con un `pool` de procesos la búsqueda se reparte entre `workers` núcleos:
+    "root" lanza búsquedas independientes y suma sus visitas, "leaf" comparte un único
+    árbol y evalúa lotes de hojas en paralelo con pérdida virtual.
+    Con `batched` las simulaciones de un lote de hojas se ejecutan vectorizadas con NumPy.
+    `prove` (ver `endgame_prover`) marca como ganados, perdidos o empatados los nodos
+    que el solver exacto consigue resolver.
+    `stats` (un SearchStats, opcional) recoge la telemetría de la búsqueda.
+    Con `rave_k` la selección mezcla estadísticas AMAF (RAVE): con `rave_k` visitas
+    un hijo pesa igual su propio valor que el AMAF. Solo en la búsqueda secuencial.
     """
-    root = Node(root_state, player)
+    if root is None:
+        root = root_from_board(root_state, player)
+
+    def load_stats(node):
+        # Consultar base de conocimiento para inicializar estadísticas del nuevo nodo
+        s = knowledge_base.get(node.canonical_key)
+        if s is not None:
+            node.visits = s.visits
+            node.wins = s.wins
+        # La telemetría solo cuenta estas consultas, no las escrituras del backup
+        if stats is not None:
+            if s is not None:
+                stats.kb_hits += 1
+            else:
+                stats.kb_misses += 1
     
     # Cargar estadísticas previas si el estado raíz ya fue visitado en entrenamientos anteriores
-    root_key = root_state.tobytes()
-    if root_key in knowledge_base:
-        s = knowledge_base[root_key]
-        root.visits = s.visits
-        root.wins = s.wins
+    # Claves canónicas: una posición y su reflejo comparten estadísticas
+    if root.visits == 0:
+        load_stats(root)
 
-    start_time = time.time()
-    
-    # Bucle principal de búsqueda limitado por tiempo
-    while (time.time() - start_time) < time_limit:
-        # Ejecución por lotes (50 iteraciones) para reducir la sobrecarga de time.time()
-        for _ in range(50): 
-            node = root
-            
-            # 1. Selección
-            while node.untried == [] and node.children:
-                node = node.best_child()
-            
-            # 2. Expansión
-            if node.untried:
-                node = node.expand()
-                # Consultar base de conocimiento para inicializar estadísticas del nuevo nodo
-                k = node.state.tobytes()
-                if k in knowledge_base:
-                    node.visits = knowledge_base[k].visits
-                    node.wins = knowledge_base[k].wins
+    def store_stats(node, reward):
+        # Actualizar base de conocimiento en memoria (la raíz solo cuenta visitas)
+        if node.parent is None: return
+        k = node.canonical_key
+        s = knowledge_base.get(k)
+        if s is None:
+            s = knowledge_base[k] = StateStats()
+        s.visits += 1
+        s.wins += reward
 
-            # 3. Simulación
-            winner = fast_rollout(node.state, node.player)
-            
-            # 4. Backpropagation
-            curr = node
-            while curr.parent is not None:
-                move_maker = curr.parent.player
-                # Asignar recompensa relativa al jugador que realizó el movimiento
-                reward = 1.0 if winner == move_maker else (0.0 if winner == -move_maker else 0.5)
-                curr.update(reward)
-                
-                # Actualizar base de conocimiento en memoria
-                k = curr.state.tobytes()
-                if k not in knowledge_base:
-                    knowledge_base[k] = StateStats()
-                knowledge_base[k].visits += 1
-                knowledge_base[k].wins += reward
-                
-                curr = curr.parent
-            root.visits += 1
-            
-        # Verificación de tiempo límite tras completar el lote
-        if (time.time() - start_time) > time_limit: break
+    # Ejecución por lotes (50 iteraciones) para reducir la sobrecarga del reloj
+    engine = MCTS(
+        select=ucb1(C_PARAM) if rave_k is None else rave(C_PARAM, k=rave_k),
+        rollout=fast_rollout,
+        backup=make_backup(win=1.0, loss=0.0, on_update=store_stats),
+        on_expand=load_stats,
+        batch=50,
+        prove=prove,
+        stats=stats,
+        amaf=make_amaf(win=1.0, loss=0.0) if rave_k is not None else None,
+    )
+    if pool is None and batched:
+        # Mismo límite de 20 movimientos que fast_rollout
+        batched_search(engine, root, time_limit, virtual_loss=0.0, max_plies=20)
+    elif pool is None:
+        engine.search(root, time_limit=time_limit)
+    elif parallel == "leaf":
+        leaf_parallel_search(pool, engine, root, time_limit, workers, virtual_loss=0.0)
+    else:
+        merged = root_parallel_search(pool, root, workers, time_limit, rollout=fast_rollout, c=C_PARAM)
+        # Los procesos no comparten la base de conocimiento: se actualiza con los hijos de la raíz
+        for child in root.children:
+            visits, wins = merged.get(child.action, (0, 0.0))
+            if visits == 0: continue
+            k = child.canonical_key
+            s = knowledge_base.get(k)
+            if s is None:
+                s = knowledge_base[k] = StateStats()
+            s.visits += visits
+            s.wins += wins
+        if stats is not None:
+            # Las visitas de los procesos no pasan por el árbol local
+            stats.iterations += sum(visits for visits, _ in merged.values())
+            stats.root_visits = [merged.get(c, (0, 0.0))[0] for c in range(7)]
+
+    if stats is not None:
+        if pool is None or parallel == "leaf":
+            stats.record_root(root)
 
     # Retornar la acción del nodo hijo más visitado
-    if not root.children:
-        valid = [c for c in range(7) if root_state[0, c] == 0]
-        return valid[0] if valid else 0
-    return max(root.children, key=lambda c: c.visits).action
+    return best_action(root)
 
 class WinortzPolicy(Policy):
     def __init__(self):
         self.time_out = 9
-        self.knowledge_base = {}
+        self.knowledge_base = KnowledgeBase()
+        self.tree = None  # Raíz de la última búsqueda
+        self.workers = 1
+        self.parallel = "root"
+        self.pool = None
+        self.batched = False
+        self.rave_k = None
+        self.solver = Solver()  # Su tabla de transposiciones se conserva entre jugadas
         current_dir = os.path.dirname(os.path.abspath(__file__))
-        self.knowledge_file = os.path.join(current_dir, "brain_optimized.pkl.gz")
+        self.knowledge_file = os.path.join(current_dir, "brain_optimized.kb")
+        # Formato anterior (pickle comprimido), se convierte una sola vez
+        self.legacy_file = os.path.join(current_dir, "brain_optimized.pkl.gz")
+        # Libro de aperturas generado offline (python -m connect4.opening_book), opcional
+        self.book = OpeningBook(os.path.join(current_dir, "opening.book"))
 
     @override
-    def mount(self, time_out: int) -> None:
+    def mount(self, time_out: int = 9, workers: int = 1, parallel: str = "root", batched: bool = False,
+              kb_capacity: int | None = KB_CAPACITY, rave_k: float | None = None) -> None:
         """
         Inicializa la política: carga el límite de tiempo y la base de conocimiento.
+        Con `workers > 1` la búsqueda usa un pool de procesos ("root" o "leaf"), creado
+        una sola vez por proceso y reutilizado en todas las jugadas y partidas.
+        "leaf" solo compensa con varios núcleos y simulaciones costosas: cada lote viaja
+        entre procesos y, con simulaciones baratas, se evalúan menos hojas que en secuencial.
+        Con un solo núcleo no se crea el pool y la búsqueda es secuencial.
+        Con `batched` las simulaciones se ejecutan por lotes vectorizados (sin pool).
+        `kb_capacity` acota los estados en memoria: al superarlo se descartan los menos
+        visitados, así la memoria no crece con el número de partidas (None = sin límite).
+        `rave_k` activa RAVE/AMAF en la selección (ver `run_mcts`).
         """
         self.time_out = float(time_out)
+        if parallel not in ("root", "leaf"):
+            raise ValueError(f"Modo paralelo desconocido: {parallel}")
+        self.workers = workers
+        self.parallel = parallel
+        self.pool = get_pool(workers) if workers > 1 and (os.cpu_count() or 1) > 1 else None
+        self.batched = batched
+        self.rave_k = rave_k
         
-        if os.path.exists(self.knowledge_file):
-            try:
-                with gzip.open(self.knowledge_file, "rb") as f:
-                    raw_data = pickle.load(f)
-                # Reconstrucción de objetos StateStats a partir de datos serializados
-                self.knowledge_base = {
-                    k: StateStats(wins=v[0], visits=v[1]) 
-                    for k, v in raw_data.items()
-                }
-            except: self.knowledge_base = {}
+        try:
+            if not os.path.exists(self.knowledge_file) and os.path.exists(self.legacy_file):
+                convert_legacy(self.legacy_file, self.knowledge_file)
+            # El archivo se mapea en memoria: no se carga nada hasta consultarlo
+            self.knowledge_base = KnowledgeBase(self.knowledge_file, capacity=kb_capacity)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError) as e:
+            # Archivo corrupto o con otro formato: se juega sin conocimiento previo, pero se avisa.
+            # Cualquier otro error (p. ej. un fallo en convert_legacy) se propaga
+            warnings.warn(f"No se pudo cargar la base de conocimiento ({e}); se empieza vacía.")
+            self.knowledge_base = KnowledgeBase(capacity=kb_capacity)
+
+    @override
+    def new_game(self) -> None:
+        # El árbol de la partida anterior no sirve; la base de conocimiento se conserva
+        self.tree = None
 
     @override
     def act(self, s: np.ndarray) -> int:
+        start = time.perf_counter()
+        # Sin búsqueda (libro o solver) no hay estadísticas de esta jugada
+        self.last_stats = None
         total = np.count_nonzero(s)
-        player = 1 if total % 2 == 0 else -1
+        player = player_to_move(s)
         
         # Limitar a 1.5s para evitar timeout
         limit = min(self.time_out * 0.9, 1.5)
-        # Reducir tiempo en fases finales del juego
-        if total > 30: limit = 0.5
         
-        return run_mcts(s, player, limit, self.knowledge_base)
-
-    def save_smart_knowledge(self, min_visits=5, max_states=40000):
+        # Aperturas: jugada precalculada, sin búsqueda
+        position, mask = board_to_bitboards(s, player)
+        action = self.book.lookup(position, mask, player)
+        if action is not None:
+            return action
+        
+        # Final de partida: el solver exacto decide con todo el tiempo disponible.
+        # Antes solo se le da un 5% del tiempo, por si hay una táctica corta demostrable
+        budget = limit if s.size - total <= SOLVER_EMPTY else 0.05 * limit
+        action, value = self.solver.best_move(position, mask, time_limit=budget)
+        # Una derrota demostrada se sigue jugando con MCTS, por si el rival se equivoca
+        if action is not None and value >= 0:
+            return action
+        limit -= time.perf_counter() - start
         
-        # Filtrado por relevancia
-        candidates = [(k, v) for k, v in self.knowledge_base.items() if v.visits >= min_visits]
+        # Telemetría opcional: solo se instrumenta la búsqueda si el árbitro la pide
+        stats = SearchStats() if self.collect_stats else None
+        self.last_stats = stats
         
-        if len(candidates) > max_states:
-            candidates.sort(key=lambda item: item[1].visits, reverse=True)
-            candidates = candidates[:max_states]
-            
-       
-        optimized = {k: (v.wins, v.visits) for k, v in candidates}
+        # Reutilizar el subárbol de la jugada anterior (nuestra jugada + respuesta rival)
+        # (en modo "root" cada proceso parte de un árbol nuevo)
+        if self.pool is not None and self.parallel == "root":
+            self.tree = None
+        else:
+            self.tree = advance_root(self.tree, s, player)
+        return run_mcts(
+            s, player, limit, self.knowledge_base, root=self.tree,
+            pool=self.pool, workers=self.workers, parallel=self.parallel, batched=self.batched,
+            prove=endgame_prover(self.solver, PROOF_EMPTY), stats=stats, rave_k=self.rave_k,
+        )
+
+    def save_smart_knowledge(self, min_visits=5, max_states=40000, compact_every=8):
+        """
+        Guardado incremental: solo se escriben los estados modificados desde el último
+        guardado, en un segmento delta. Cada `compact_every` segmentos se compactan en
+        segundo plano sobre el archivo base, aplicando el filtrado por `min_visits` y
+        `max_states`.
+        """
+        kb = self.knowledge_base
+        if not isinstance(kb, KnowledgeBase):
+            kb = KnowledgeBase.from_stats(kb)
         
         try:
-            with gzip.open(self.knowledge_file, "wb") as f:
-                pickle.dump(optimized, f)
-            print(f"Datos guardados: {len(optimized)} estados procesados.")
-            # Actualización de memoria local con datos optimizados
-            self.knowledge_base = {k: StateStats(wins=v[0], visits=v[1]) for k, v in optimized.items()}
+            if kb.path != self.knowledge_file:
+                # Base sin archivo propio: se escribe completa, ordenada por clave
+                n = kb.save(self.knowledge_file, min_visits=min_visits, max_states=max_states)
+            else:
+                n = kb.checkpoint()
+                if kb.segments >= compact_every:
+                    kb.compact_async(min_visits=min_visits, max_states=max_states)
+            print(f"Datos guardados: {n} estados procesados.")
+            # La memoria local pasa a ser el archivo recién escrito, mapeado en memoria
+            self.knowledge_base = kb
         except Exception as e:
             print(e)
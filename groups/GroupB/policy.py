@@ -1,142 +1,98 @@
+import os
+import random
 import numpy as np
-import math
-import time
 from connect4.policy import Policy
+from connect4.bitboard_state import TOP_MASKS, board_to_bitboards, has_won, player_to_move
+from connect4.mcts import (
+    MCTS, SearchStats, advance_root, apply_move, best_action, make_amaf, make_backup, rave,
+    root_from_board, ucb1,
+)
+from connect4.opening_book import OpeningBook
+from connect4.transposition import TranspositionMCTS, TranspositionTable
 from typing import override
 
 
 
-class Node:
-    def __init__(self, state, player, parent=None, action=None):
-        self.state = state
-        self.player = player          # jugador que mueve en este nodo
-        self.parent = parent
-        self.action = action          # acción que llevó a este nodo
-        self.children = []
-        self.untried = self.valid_actions(state)
-        self.wins = 0
-        self.visits = 0
-
-    def valid_actions(self, s):
-        return [c for c in range(7) if s[0, c] == 0]
-
-    def expand(self):
-        c = self.untried.pop()
-        child_state = apply_move(self.state, c, self.player)
-        next_player = -self.player
-        child = Node(child_state, next_player, self, c)
-        self.children.append(child)
-        return child
-
-    def best_child(self, c_param=1.4):
-        best = None
-        best_val = -1e9
-        for ch in self.children:
-            ucb = (ch.wins / (ch.visits + 1e-9)) + \
-                  c_param * math.sqrt(math.log(self.visits + 1) / (ch.visits + 1e-9))
-            if ucb > best_val:
-                best_val = ucb
-                best = ch
-        return best
-
-    def update(self, result):
-        self.visits += 1
-        self.wins += result
-
-
-def apply_move(state, col, p):
-    b = state.copy()
-    for r in range(5, -1, -1):
-        if b[r, col] == 0:
-            b[r, col] = p
-            return b
-    return b
-
-
-def check_win(b, p):
-    # horizontal
-    for r in range(6):
-        for c in range(4):
-            if b[r,c]==p and b[r,c+1]==p and b[r,c+2]==p and b[r,c+3]==p:
-                return True
-    # vertical
-    for r in range(3):
-        for c in range(7):
-            if b[r,c]==p and b[r+1,c]==p and b[r+2,c]==p and b[r+3,c]==p:
-                return True
-    # diag "\"
-    for r in range(3):
-        for c in range(4):
-            if b[r,c]==p and b[r+1,c+1]==p and b[r+2,c+2]==p and b[r+3,c+3]==p:
-                return True
-    # diag "/"
-    for r in range(3):
-        for c in range(3,7):
-            if b[r,c]==p and b[r+1,c-1]==p and b[r+2,c-2]==p and b[r+3,c-3]==p:
-                return True
-    return False
-
-
-def rollout(state, player):
-    b = state.copy()
+def rollout(position, mask, player, moves=None):
+    # con `moves` se anotan las columnas jugadas (estadísticas AMAF)
     p = player
+    actions = [c for c in range(7) if not mask & TOP_MASKS[c]]
     while True:
-        actions = [c for c in range(7) if b[0, c] == 0]
         if not actions:
             return 0
 
-        c = np.random.choice(actions)
-        b = apply_move(b, c, p)
+        i = int(random.random() * len(actions))
+        c = actions[i]
+        if moves is not None:
+            moves.append(c)
+        position, mask = apply_move(position, mask, c)
 
-        if check_win(b, p):
+        if has_won(position ^ mask):
             return p 
 
+        # columna llena
+        if mask & TOP_MASKS[c]:
+            del actions[i]
         p = -p
 
 
-def mcts(root_state, player, time_limit):
-    root = Node(root_state, player)
-    end = time.time() + time_limit
+def mcts(root_state, player, time_limit, root=None, stats=None, rave_k=None):
+    if root is None:
+        root = root_from_board(root_state, player)
 
-    while time.time() < end:
-        node = root
+    # recompensas +1 / 0 / -1 desde el punto de vista de quien movió
+    # con rave_k la selección mezcla el valor de cada hijo con su valor AMAF
+    engine = MCTS(
+        select=ucb1(c=1.4) if rave_k is None else rave(c=1.4, k=rave_k),
+        rollout=rollout,
+        backup=make_backup(win=1.0, loss=-1.0),
+        stats=stats,
+        amaf=make_amaf(win=1.0, loss=-1.0) if rave_k is not None else None,
+    )
+    engine.search(root, time_limit=time_limit)
+    if stats is not None:
+        stats.record_root(root)
 
-        # 1. Selección
-        while node.untried == [] and node.children:
-            node = node.best_child()
+    return best_action(root)
 
-        # 2. Expansión
-        if node.untried:
-            node = node.expand()
 
-        # 3. Simulación
-        result = rollout(node.state, node.player)
-
-        if result == player:
-            value = 1
-        elif result == -player:
-            value = -1
-        else:
-            value = 0
-
-        # 4. Backpropagation
-        while node is not None:
-            node.update(value if node.player != player else -value)
-            node = node.parent
-
-   
-    best = max(root.children, key=lambda ch: ch.visits)
-    return best.action
+class WinPolicy(Policy):
 
+    def __init__(self):
+        self.tree = None  # raíz de la búsqueda anterior
+        self.search = None  # búsqueda con tabla de transposiciones (opcional)
+        self.rave_k = None  # RAVE/AMAF en la búsqueda con árbol (opcional)
+        # libro de aperturas (python -m connect4.opening_book), vacío si no existe el archivo
+        self.book = OpeningBook(os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening.book"))
 
-class WinPolicy(Policy):
+    @override
+    def mount(self, time_out: int = 9, table_size: int = 0, rave_k: float | None = None):
+        # con table_size > 0 se busca sobre un grafo de posiciones con memoria acotada
+        self.rave_k = rave_k
+        if table_size > 0:
+            self.search = TranspositionMCTS(
+                TranspositionTable(table_size), c=1.4, rollout=rollout, win=1.0, loss=-1.0
+            )
 
     @override
-    def mount(self, time_out: int):
-        pass
+    def new_game(self) -> None:
+        # la tabla de transposiciones sigue siendo válida entre partidas
+        self.tree = None
 
     @override
     def act(self, s: np.ndarray) -> int:
-        total = np.count_nonzero(s)
-        player = 1 if total % 2 == 0 else -1
-        return mcts(s, player, time_limit=0.3)
+        # sin búsqueda MCTS (libro o tabla) no hay estadísticas de esta jugada
+        self.last_stats = None
+        player = player_to_move(s)
+        position, mask = board_to_bitboards(s, player)
+        action = self.book.lookup(position, mask, player)
+        if action is not None:
+            return action
+        if self.search is not None:
+            # la tabla se conserva entre jugadas, así que también reutiliza lo ya buscado
+            return self.search.search(position, mask, player, time_limit=0.3)
+        # reutiliza el nieto que corresponde a nuestra jugada y la del rival
+        self.tree = advance_root(self.tree, s, player)
+        # telemetría solo si el árbitro la pide (la búsqueda con tabla no la reporta)
+        self.last_stats = SearchStats() if self.collect_stats else None
+        return mcts(s, player, time_limit=0.3, root=self.tree, stats=self.last_stats, rave_k=self.rave_k)
@@ -1,17 +1,29 @@
+import argparse
+
 from connect4.policy import Policy
-from connect4.utils import find_importable_classes
+from connect4.utils import discover_classes
 from tournament import run_tournament, play
 
-# Read all files within subfolder of "groups"
-participants = find_importable_classes("groups", Policy)
+if __name__ == "__main__":
+    # Guard needed with workers: spawned worker processes import this module
+    parser = argparse.ArgumentParser(description="Connect4 knockout tournament.")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="processes playing the matches of a round concurrently (default: serial)",
+    )
+    args = parser.parse_args()
+
+    # Scan all files within subfolder of "groups"; each policy is imported when first scheduled
+    participants = discover_classes("groups", Policy)
 
-# Build a participant list (name, class)
-players = list(participants.items())
+    # Build a participant list (name, class)
+    players = list(participants.items())
 
-# Run the tournament
-champion = run_tournament(
-    players,
-    play,  # You could also create your own play function for testing purposes
-    shuffle=True,
-)
-print("Champion:", champion)
+    # Run the tournament
+    champion = run_tournament(
+        players,
+        play,  # You could also create your own play function for testing purposes
+        shuffle=True,
+        workers=args.workers,
+    )
+    print("Champion:", champion)
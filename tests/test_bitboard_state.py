@@ -0,0 +1,36 @@
+import random
+
+import numpy as np
+
+from connect4.bitboard_state import BitboardState
+from connect4.connect_state import ConnectState
+
+
+def test_random_games_match_connect_state():
+    rng = random.Random(0)
+    for _ in range(200):
+        reference, state = ConnectState(), BitboardState()
+        while True:
+            assert np.array_equal(state.board, reference.board)
+            assert state.player == reference.player
+            assert state.get_winner() == reference.get_winner()
+            assert state.is_final() == reference.is_final()
+            assert state.get_free_cols() == reference.get_free_cols()
+            assert state.get_heights() == reference.get_heights()
+            assert state.key == reference.key
+            for col in range(7):
+                assert state.is_applicable(col) == reference.is_applicable(col)
+            if reference.is_final():
+                break
+            col = rng.choice(reference.get_free_cols())
+            reference, state = reference.transition(col), state.transition(col)
+
+
+def test_board_round_trip():
+    rng = random.Random(1)
+    state = BitboardState()
+    while not state.is_final():
+        state = state.transition(rng.choice(state.get_free_cols()))
+        copy = BitboardState(state.board, state.player)
+        assert (copy.position, copy.mask) == (state.position, state.mask)
+        assert copy.get_winner() == state.get_winner()
@@ -0,0 +1,52 @@
+import gzip
+import pickle
+
+import numpy as np
+
+from connect4.bitboard_state import canonical_key
+from connect4.connect_state import ConnectState
+from connect4.knowledge import KnowledgeBase, convert_legacy, legacy_key
+
+
+def legacy_board(moves: list[int], dtype=np.int64) -> np.ndarray:
+    """Board of the legacy trainer, where player 1 moved first."""
+    board = np.zeros((6, 7), dtype=dtype)
+    player = 1
+    for col in moves:
+        row = max(r for r in range(6) if board[r, col] == 0)
+        board[row, col] = player
+        player = -player
+    return board
+
+
+def referee_key(moves: list[int]) -> int:
+    """Canonical key of the position the referee reaches with the same moves."""
+    state = ConnectState()
+    for col in moves:
+        state = state.transition(col)
+    return canonical_key(state.key)[0]
+
+
+def test_legacy_key_swaps_colours():
+    for moves in ([3], [3, 3], [0, 1, 2, 6, 6]):
+        assert legacy_key(legacy_board(moves).tobytes()) == referee_key(moves)
+        # Training boards were stored as float64
+        assert legacy_key(legacy_board(moves, np.float64).tobytes()) == referee_key(moves)
+
+
+def test_convert_legacy_merges_mirrors(tmp_path):
+    src, dst = tmp_path / "brain.pkl.gz", tmp_path / "brain.kb"
+    raw = {
+        legacy_board([3]).tobytes(): (6.0, 10),
+        legacy_board([0, 1]).tobytes(): (1.0, 4),
+        legacy_board([6, 5]).tobytes(): (2.0, 3),  # Mirror of [0, 1]
+    }
+    with gzip.open(src, "wb") as f:
+        pickle.dump(raw, f)
+
+    assert convert_legacy(str(src), str(dst)) == 2
+    kb = KnowledgeBase(str(dst))
+    center = kb.get(referee_key([3]))
+    assert (center.wins, center.visits) == (6.0, 10)
+    corner = kb.get(referee_key([0, 1]))
+    assert (corner.wins, corner.visits) == (3.0, 7)
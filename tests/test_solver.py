@@ -0,0 +1,47 @@
+import random
+
+from connect4.bitboard_state import board_to_bitboards
+from connect4.connect_state import ConnectState
+from connect4.solver import Solver
+
+
+def minimax(state: ConnectState) -> int:
+    """Exact value for the player to move (1 win, 0 draw, -1 loss), by brute force."""
+    winner = state.get_winner()
+    if winner != 0:
+        return winner * state.player
+    free = state.get_free_cols()
+    if not free:
+        return 0
+    return max(-minimax(state.transition(col)) for col in free)
+
+
+def endgames(count: int, empty: int, seed: int = 0) -> list[ConnectState]:
+    """Undecided positions of random games with ``empty`` free cells."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = ConnectState()
+        for _ in range(42 - empty):
+            state = state.transition(rng.choice(state.get_free_cols()))
+            if state.is_final():
+                break
+        else:
+            positions.append(state)
+    return positions
+
+
+def test_solve_matches_minimax():
+    solver = Solver()
+    for state in endgames(40, empty=8):
+        position, mask = board_to_bitboards(state.board, state.player)
+        assert solver.solve(position, mask) == minimax(state)
+
+
+def test_best_move_is_optimal():
+    solver = Solver()
+    for state in endgames(20, empty=8, seed=1):
+        position, mask = board_to_bitboards(state.board, state.player)
+        col, value = solver.best_move(position, mask)
+        assert value == minimax(state)
+        assert -minimax(state.transition(col)) == value
@@ -1,7 +1,17 @@
 from typing import Callable
-from connect4.dtos import Game, Match, Participant, Versus
-from connect4.connect_state import ConnectState
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from connect4.dtos import Game, LatencyStats, Match, Participant, PlayerLatency, SearchTelemetry, Versus
+from connect4.policy import Policy
+from connect4.bitboard_state import BitboardState
+from connect4.match_log import MatchLogWriter
+from connect4.ratings import RatingsTable
 import numpy as np
+import itertools
+import threading
+import time
+
+# Game phases by number of discs on the board before the move
+PHASES = ((14, "opening"), (28, "middlegame"), (42, "endgame"))
 
 
 def next_power_of_two(n: int) -> int:
@@ -21,24 +31,96 @@ def make_initial_matches(
     return [(players[i], players[i + 1]) for i in range(0, len(players), 2)]
 
 
+def save_match(match: Match) -> None:
+    """Write a match record to the versus folder."""
+    match_filename = f"match_{match.player_a}_vs_{match.player_b}.json"
+    with open("versus/" + match_filename, "w") as f:
+        f.write(match.model_dump_json(indent=4))
+
+
+# Records of the match being played by _run_match, None outside of it
+_collected: list[Match] | None = None
+
+
+def record_match(match: Match) -> None:
+    """
+    Hand a finished match record to the tournament.
+
+    Inside ``play_round`` the record is collected (also in worker processes)
+    and passed to the round's ``record`` hook in the parent; elsewhere it is
+    saved right away with ``save_match``. Custom play functions should report
+    their records through this function instead of writing files.
+    """
+    if _collected is None:
+        save_match(match)
+    else:
+        _collected.append(match)
+
+
+def _run_match(
+    play: Callable[[Participant, Participant, int, float, int], Participant],
+    a: Participant,
+    b: Participant,
+    best_of: int,
+    first_player_distribution: float,
+    seed: int,
+) -> tuple[str, list[Match]]:
+    """Play a match and return the winner's name and the records it reported."""
+    global _collected
+    previous, _collected = _collected, []
+    try:
+        winner = play(a, b, best_of, first_player_distribution, seed)
+        return winner[0], _collected
+    finally:
+        _collected = previous
+
+
 def play_round(
     versus: Versus,
     play: Callable[[Participant, Participant, int, float, int], Participant],
     best_of: int,
     first_player_distribution: float,
     seed: int,
+    executor: Executor | None = None,
+    record: Callable[[Match], None] = save_match,
 ) -> list[Participant]:
-    """Run a round and return the list of winners (handles BYEs)."""
-    winners: list[Participant] = []
+    """
+    Run a round and return the list of winners (handles BYEs).
+
+    With an ``executor`` the matches of the round are played concurrently;
+    every match keeps the same seed as in a serial run. The records reported
+    through ``record_match`` are sent back and passed to ``record`` in this
+    process, in bracket order.
+    """
     for a, b in versus:
         if a is None and b is None:
             raise ValueError("Invalid match: two BYEs")
+
+    if executor is None:
+        results = {
+            i: _run_match(play, a, b, best_of, first_player_distribution, seed)
+            for i, (a, b) in enumerate(versus)
+            if a is not None and b is not None
+        }
+    else:
+        futures = {
+            i: executor.submit(_run_match, play, a, b, best_of, first_player_distribution, seed)
+            for i, (a, b) in enumerate(versus)
+            if a is not None and b is not None
+        }
+        results = {i: future.result() for i, future in futures.items()}
+
+    winners: list[Participant] = []
+    for i, (a, b) in enumerate(versus):
         if a is None:  # b advances
             winners.append(b)
         elif b is None:  # a advances
             winners.append(a)
         else:
-            winners.append(play(a, b, best_of, first_player_distribution, seed))
+            winner_name, matches = results[i]
+            for match in matches:
+                record(match)
+            winners.append(a if winner_name == a[0] else b)
     return winners
 
 
@@ -47,14 +129,184 @@ def pair_next_round(winners: list[Participant]) -> Versus:
     return [(winners[i], winners[i + 1]) for i in range(0, len(winners), 2)]
 
 
-def play(
+def timed_act(
+    policy: Policy,
+    board: np.ndarray,
+    move_timeout: float | None = None,
+    running: dict[int, threading.Thread] | None = None,
+) -> tuple[int | None, float]:
+    """
+    Ask a policy for its action and measure how long it took.
+
+    With a ``move_timeout`` the policy runs in a daemon thread and the call
+    returns after at most that many seconds. A policy that overruns cannot be
+    stopped (Python threads cannot be killed): its thread is stored in
+    ``running`` under ``id(policy)``, and the caller must not ask that policy
+    to act again while the thread is alive (see ``play_game``).
+
+    Returns
+    -------
+    tuple[int | None, float]
+        The action, or None on timeout, and the elapsed time in seconds.
+    """
+    start = time.perf_counter()
+    if move_timeout is None:
+        action = int(policy.act(board))
+        return action, time.perf_counter() - start
+
+    outcome: list[tuple[bool, object]] = []
+
+    def run() -> None:
+        try:
+            outcome.append((True, policy.act(board)))
+        except BaseException as e:
+            outcome.append((False, e))
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(move_timeout)
+    elapsed = time.perf_counter() - start
+    if not outcome:
+        if running is not None:
+            running[id(policy)] = worker
+        return None, elapsed
+    ok, value = outcome[0]
+    if not ok:
+        raise value
+    return int(value), elapsed
+
+
+def phase_of(discs: int) -> str:
+    """Game phase of a move played with ``discs`` discs on the board."""
+    for limit, phase in PHASES:
+        if discs < limit:
+            return phase
+    return PHASES[-1][1]
+
+
+def play_game(
+    first: tuple[str, Policy],
+    second: tuple[str, Policy],
+    latencies: dict[str, dict[str, list[float]]],
+    timeouts: dict[str, int],
+    move_timeout: float | None = None,
+    timeout_rule: str = "fallback",
+    keep_history: bool = True,
+    stats: dict[str, list] | None = None,
+    running: dict[int, threading.Thread] | None = None,
+) -> tuple[int, list[int], Game]:
+    """
+    Play one game between two mounted policies.
+
+    The move times of each player are appended to ``latencies[name][phase]``
+    and its timeouts counted in ``timeouts[name]``. A policy whose timed-out
+    call is still running (tracked in ``running``, shared by the games of a
+    match) is not asked again: each of its turns counts as another timeout
+    until the call returns. With ``stats`` the
+    ``last_stats`` reported by a policy after each move are appended to
+    ``stats[name]`` (see ``telemetry_summary``).
+
+    Returns
+    -------
+    tuple[int, list[int], Game]
+        The winner (-1 for ``first``, 1 for ``second``, 0 for a draw), the
+        moves played and the state-action history (empty unless
+        ``keep_history``).
+    """
+    if running is None:
+        running = {}
+    first_policy, second_policy = first[1], second[1]
+    first_policy.new_game()
+    second_policy.new_game()
+
+    state = BitboardState()
+    game_history: Game = Game()
+    moves: list[int] = []
+
+    while not state.is_final():
+        current_name, current_policy = first if state.player == -1 else second
+        board = state.board.copy()
+        pending = running.get(id(current_policy))
+        if pending is not None and pending.is_alive():
+            # Still busy with a move that timed out: acting again would race with it
+            action = None
+        else:
+            if stats is not None:
+                current_policy.last_stats = None
+            action, elapsed = timed_act(current_policy, board, move_timeout, running)
+            latencies[current_name].setdefault(phase_of(len(moves)), []).append(elapsed)
+        if stats is not None and action is not None and current_policy.last_stats is not None:
+            stats[current_name].append(current_policy.last_stats)
+        if action is None:
+            timeouts[current_name] += 1
+            if timeout_rule == "forfeit":
+                return -state.player, moves, game_history
+            action = min(state.get_free_cols(), key=lambda c: abs(c - 3))
+        if keep_history:
+            game_history.append((board.tolist(), action))
+        moves.append(action)
+        state = state.transition(action)
+
+    return state.get_winner(), moves, game_history
+
+
+def latency_summary(
+    latencies: dict[str, dict[str, list[float]]], timeouts: dict[str, int]
+) -> dict[str, PlayerLatency]:
+    """Summarize the move times gathered by ``play_game`` for ``Match.latency``."""
+    return {
+        name: PlayerLatency(
+            overall=LatencyStats.from_samples(
+                [t for samples in phases.values() for t in samples]
+            ),
+            phases={
+                phase: LatencyStats.from_samples(phases[phase])
+                for _, phase in PHASES
+                if phase in phases
+            },
+            timeouts=timeouts[name],
+        )
+        for name, phases in latencies.items()
+    }
+
+
+def telemetry_summary(stats: dict[str, list]) -> dict[str, SearchTelemetry]:
+    """Summarize the search statistics gathered by ``play_game`` for ``Match.telemetry``."""
+    return {name: SearchTelemetry.from_stats(moves) for name, moves in stats.items() if moves}
+
+
+def play_match(
     a: Participant,
     b: Participant,
     best_of: int,
     first_player_distribution: float,
     seed: int = 911,
-) -> Participant:
-    """Play a match between two participants and return the winner."""
+    log: MatchLogWriter | None = None,
+    move_timeout: float | None = None,
+    timeout_rule: str = "fallback",
+    telemetry: bool = False,
+) -> tuple[Participant, Match]:
+    """
+    Play a match between two participants and return the winner and the match record.
+
+    Each policy is constructed and mounted once per match; ``new_game()`` is
+    called on both before every game. With a ``log`` every game is written to
+    it as soon as it ends and the returned record keeps no games.
+
+    Every move is timed and the latency of each player, overall and per game
+    phase, is stored in ``Match.latency``. With a ``move_timeout`` (seconds) a
+    move that takes longer is handled by ``timeout_rule``: ``"fallback"``
+    plays the free column closest to the center instead, ``"forfeit"`` loses
+    the game. The overrunning call keeps running in the background and the
+    policy is not asked to act again until it returns; meanwhile its moves are
+    handled by the same rule.
+
+    With ``telemetry`` the policies are asked to report search statistics
+    (``Policy.collect_stats``), summarized per player in ``Match.telemetry``.
+    """
+    if timeout_rule not in ("fallback", "forfeit"):
+        raise ValueError(f"Unknown timeout rule: {timeout_rule}")
+
     # Variables
     a_name, a_policy = a
     b_name, b_policy = b
@@ -68,41 +320,46 @@ def play(
     rng = np.random.default_rng(seed)
 
     games: list[Game] = []
+    latencies: dict[str, dict[str, list[float]]] = {a_name: {}, b_name: {}}
+    timeouts = {a_name: 0, b_name: 0}
+    stats: dict[str, list] | None = {a_name: [], b_name: []} if telemetry else None
+    running: dict[int, threading.Thread] = {}
+
+    # Construct and mount agents once per match
+    a_agent, b_agent = (a_name, a_policy()), (b_name, b_policy())
+    a_agent[1].mount()
+    b_agent[1].mount()
+    a_agent[1].collect_stats = b_agent[1].collect_stats = telemetry
 
     while a_wins < games_to_win and b_wins < games_to_win:
         total_games += 1
         # Decide who goes first based on the distribution
         if rng.random() < first_player_distribution:
-            first_participant, second_participant = a, b
-            first_policy, second_policy = a_policy(), b_policy()
+            first, second = a_agent, b_agent
         else:
-            first_participant, second_participant = b, a
-            first_policy, second_policy = b_policy(), a_policy()
+            first, second = b_agent, a_agent
 
-        # Mount agents
-        first_policy.mount()
-        second_policy.mount()
-
-        state = ConnectState()
-        game_history: Game = Game()
-
-        while not state.is_final():
-            current_policy = first_policy if state.player == -1 else second_policy
-            action = current_policy.act(state.board)
-            game_history.append((state.board.copy().tolist(), int(action)))
-            state = state.transition(int(action))
-
-        games.append(game_history)
+        winner, moves, game_history = play_game(
+            first, second, latencies, timeouts, move_timeout, timeout_rule,
+            keep_history=log is None, stats=stats, running=running,
+        )
 
         # Determine winner
-        winner = state.get_winner()
+        if log is None:
+            games.append(game_history)
+        else:
+            winner_name = None
+            if winner != 0:
+                winner_name = (first if winner == -1 else second)[0]
+            log.write_game(moves, first[0], winner_name)
+
         if winner == -1:
-            if first_participant == a:
+            if first is a_agent:
                 a_wins += 1
             else:
                 b_wins += 1
         elif winner == 1:
-            if second_participant == a:
+            if second is a_agent:
                 a_wins += 1
             else:
                 b_wins += 1
@@ -121,17 +378,237 @@ def play(
         player_b_wins=b_wins,
         draws=draws,
         games=games,
+        latency=latency_summary(latencies, timeouts),
+        telemetry=telemetry_summary(stats) if stats is not None else {},
     )
 
-    # Save to file
-    match_filename = f"match_{a_name}_vs_{b_name}.json"
-    with open("versus/" + match_filename, "w") as f:
-        f.write(match.model_dump_json(indent=4))
-
     if a_wins > 0 or b_wins > 0:
-        return a if a_wins > b_wins else b
+        return (a if a_wins > b_wins else b), match
     # Decide winner at random in case of too many draws with no wins or tie
-    return a if rng.random() < 0.5 else b
+    return (a if rng.random() < 0.5 else b), match
+
+
+def play(
+    a: Participant,
+    b: Participant,
+    best_of: int,
+    first_player_distribution: float,
+    seed: int = 911,
+    log_format: str = "json",
+    move_timeout: float | None = None,
+    timeout_rule: str = "fallback",
+    telemetry: bool = False,
+) -> Participant:
+    """
+    Play a match between two participants, save it and return the winner.
+
+    ``log_format`` selects the record written to the versus folder: ``"json"``
+    dumps the whole match with every board once it is over, ``"jsonl"``
+    streams the move sequence of each game as soon as it ends (see
+    ``connect4.match_log``). The JSON record goes through ``record_match``;
+    the streamed log is written where the match is played. Use
+    ``functools.partial(play, log_format="jsonl")`` to pass the streaming
+    referee to ``run_tournament``. ``move_timeout``,
+    ``timeout_rule`` and ``telemetry`` are forwarded to ``play_match``.
+    """
+    if log_format == "json":
+        winner, match = play_match(
+            a, b, best_of, first_player_distribution, seed,
+            move_timeout=move_timeout, timeout_rule=timeout_rule, telemetry=telemetry,
+        )
+        record_match(match)
+        return winner
+    if log_format != "jsonl":
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    with MatchLogWriter(f"versus/match_{a[0]}_vs_{b[0]}.jsonl", a[0], b[0]) as log:
+        winner, match = play_match(
+            a, b, best_of, first_player_distribution, seed, log,
+            move_timeout=move_timeout, timeout_rule=timeout_rule, telemetry=telemetry,
+        )
+        log.close(match)
+    return winner
+
+
+def play_series(
+    a: Participant,
+    b: Participant,
+    games: int,
+    first_player_distribution: float,
+    seed: int = 911,
+    move_timeout: float | None = None,
+    timeout_rule: str = "fallback",
+    telemetry: bool = False,
+) -> Match:
+    """
+    Play exactly ``games`` games between two participants.
+
+    Used by leagues: no game history is kept, the returned record only holds
+    the result counts, the latency summary and, with ``telemetry``, the
+    search statistics.
+    """
+    a_name, b_name = a[0], b[0]
+    latencies: dict[str, dict[str, list[float]]] = {a_name: {}, b_name: {}}
+    timeouts = {a_name: 0, b_name: 0}
+    stats: dict[str, list] | None = {a_name: [], b_name: []} if telemetry else None
+    running: dict[int, threading.Thread] = {}
+    results = {-1: 0, 0: 0, 1: 0}  # From a's point of view: loss, draw, win
+
+    rng = np.random.default_rng(seed)
+    a_agent, b_agent = (a_name, a[1]()), (b_name, b[1]())
+    a_agent[1].mount()
+    b_agent[1].mount()
+    a_agent[1].collect_stats = b_agent[1].collect_stats = telemetry
+    for _ in range(games):
+        if rng.random() < first_player_distribution:
+            winner, _, _ = play_game(
+                a_agent, b_agent, latencies, timeouts, move_timeout, timeout_rule, False, stats, running
+            )
+            results[-winner] += 1
+        else:
+            winner, _, _ = play_game(
+                b_agent, a_agent, latencies, timeouts, move_timeout, timeout_rule, False, stats, running
+            )
+            results[winner] += 1
+
+    return Match(
+        player_a=a_name,
+        player_b=b_name,
+        player_a_wins=results[1],
+        player_b_wins=results[-1],
+        draws=results[0],
+        latency=latency_summary(latencies, timeouts),
+        telemetry=telemetry_summary(stats) if stats is not None else {},
+    )
+
+
+def swiss_pairings(
+    table: RatingsTable, byes: set[str]
+) -> tuple[list[tuple[str, str]], str | None]:
+    """
+    Pair the players of a Swiss round.
+
+    Players are ranked by points; each one in turn meets the best ranked
+    player it has not met yet (or the next one if it has met them all). With
+    an odd number of players the lowest ranked one without a bye sits out;
+    ``run_league`` credits it as a won pairing.
+
+    Returns
+    -------
+    tuple[list[tuple[str, str]], str | None]
+        Pairings of names and the player getting the bye, if any.
+    """
+    points = table.points()
+    ranked = [table.names[i] for i in np.argsort(-points, kind="stable")]
+    bye = None
+    if len(ranked) % 2:
+        bye = next((name for name in reversed(ranked) if name not in byes), ranked[-1])
+        ranked.remove(bye)
+
+    pairings = []
+    while ranked:
+        a = ranked.pop(0)
+        b = next((name for name in ranked if not table.played(a, name)), ranked[0])
+        ranked.remove(b)
+        pairings.append((a, b))
+    return pairings, bye
+
+
+def run_league(
+    players: list[Participant],
+    games_per_pairing: int = 10,
+    mode: str = "round_robin",
+    rounds: int | None = None,
+    first_player_distribution: float = 0.5,
+    seed: int = 911,
+    workers: int | None = None,
+    move_timeout: float | None = None,
+    timeout_rule: str = "fallback",
+) -> RatingsTable:
+    """
+    Run a league among the given players and rate them.
+
+    Parameters
+    ----------
+    players : List[Participant]
+        List of participants (name, policy) tuples.
+    games_per_pairing : int, optional
+        Games played by every pairing (default is 10).
+    mode : str, optional
+        ``"round_robin"`` plays every pairing, ``"swiss"`` plays ``rounds``
+        rounds pairing players with similar scores (default is "round_robin").
+        A Swiss bye is worth ``games_per_pairing`` points, like a won pairing,
+        and does not change the ratings.
+    rounds : int, optional
+        Number of Swiss rounds (default is the ceiling of log2 of the players).
+    first_player_distribution : float, optional
+        Distribution of games as first player (default is 0.5).
+    seed : int, optional
+        Random seed for reproducibility (default is 911).
+    workers : int, optional
+        Number of processes playing the pairings concurrently (default is None,
+        playing every pairing in this process).
+    move_timeout, timeout_rule : optional
+        Per-move deadline and its rule, see ``play_match``.
+
+    Returns
+    -------
+    RatingsTable
+        Results of every pairing; ``standings()`` gives the Elo table. Results
+        are added and printed as soon as each pairing finishes.
+    """
+    if mode not in ("round_robin", "swiss"):
+        raise ValueError(f"Unknown league mode: {mode}")
+
+    participants = dict(players)
+    table = RatingsTable(list(participants))
+    seeds = itertools.count(seed)
+    executor = ProcessPoolExecutor(workers) if workers is not None and workers > 1 else None
+
+    def play_pairings(pairings: list[tuple[str, str]]) -> None:
+        tasks = [
+            (
+                (a, participants[a]), (b, participants[b]), games_per_pairing,
+                first_player_distribution, next(seeds), move_timeout, timeout_rule,
+            )
+            for a, b in pairings
+        ]
+        if executor is None:
+            results = (play_series(*task) for task in tasks)
+        else:
+            results = (
+                future.result()
+                for future in as_completed([executor.submit(play_series, *task) for task in tasks])
+            )
+        for match in results:
+            table.add(match)
+            print(
+                f"{match.player_a} {match.player_a_wins} - {match.player_b_wins} "
+                f"{match.player_b} ({match.draws} draws)"
+            )
+
+    try:
+        if mode == "round_robin":
+            play_pairings(list(itertools.combinations(participants, 2)))
+        else:
+            if rounds is None:
+                rounds = max(1, (len(players) - 1).bit_length())
+            byes: set[str] = set()
+            for _ in range(rounds):
+                pairings, bye = swiss_pairings(table, byes)
+                if bye is not None:
+                    byes.add(bye)
+                    table.add_bye(bye, games_per_pairing)
+                print("Next Matches:", pairings, "BYE:", bye)
+                play_pairings(pairings)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for name, rating, points, games in table.standings():
+        # Points include byes, games only the ones played
+        print(f"{name}: {rating:.0f} Elo, {points:g} points, {games} games")
+    return table
 
 
 def run_tournament(
@@ -141,6 +618,8 @@ def run_tournament(
     first_player_distribution: float = 0.5,
     shuffle: bool = True,
     seed: int = 911,
+    workers: int | None = None,
+    record: Callable[[Match], None] = save_match,
 ):
     """
     Run a tournament among the given players using the provided play function.
@@ -159,14 +638,29 @@ def run_tournament(
         Whether to shuffle initial pairings (default is True).
     seed : int, optional
         Random seed for reproducibility (default is 911).
+    workers : int, optional
+        Number of processes playing the matches of a round concurrently
+        (default is None, playing every match in this process). Policies and the
+        play function must be importable by the worker processes, and the
+        calling script must be guarded by ``if __name__ == "__main__":``.
+    record : Callable[[Match], None], optional
+        Called in this process with every record reported by the play function
+        through ``record_match`` (default is ``save_match``).
 
     """
-    versus = make_initial_matches(players, shuffle=shuffle, seed=seed)
-    print("Initial Matches:", versus)
-    while True:
-        winners = play_round(versus, play, best_of, first_player_distribution, seed)
-        print("Winners this round:", winners)
-        if len(winners) == 1:  # champion decided
-            return winners[0]
-        versus = pair_next_round(winners)
-        print("Next Matches:", versus)
+    executor = ProcessPoolExecutor(workers) if workers is not None and workers > 1 else None
+    try:
+        versus = make_initial_matches(players, shuffle=shuffle, seed=seed)
+        print("Initial Matches:", versus)
+        while True:
+            winners = play_round(
+                versus, play, best_of, first_player_distribution, seed, executor, record
+            )
+            print("Winners this round:", winners)
+            if len(winners) == 1:  # champion decided
+                return winners[0]
+            versus = pair_next_round(winners)
+            print("Next Matches:", versus)
+    finally:
+        if executor is not None:
+            executor.shutdown()
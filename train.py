@@ -1,88 +1,97 @@
 import numpy as np
+import multiprocessing as mp
 import os
+import random
 import sys
 
 sys.path.append(os.getcwd())
+from connect4.policy import Policy
+from tournament import play_game
 try:
-    from groups.GroupA.policy import MCTSPolicy
+    from groups.GroupA.policy import WinortzPolicy
     from groups.GroupB.policy import WinPolicy
 except:
     print("Error importando policies")
     sys.exit()
 
-def check_win(b, p):
-    for r in range(6):
-        for c in range(4):
-            if b[r,c]==p and b[r,c+1]==p and b[r,c+2]==p and b[r,c+3]==p: return True
-    for c in range(7):
-        for r in range(3):
-            if b[r,c]==p and b[r+1,c]==p and b[r+2,c]==p and b[r+3,c]==p: return True
-    for r in range(3):
-        for c in range(4):
-            if b[r,c]==p and b[r+1,c+1]==p and b[r+2,c+2]==p and b[r+3,c+3]==p: return True
-            if b[r+3,c]==p and b[r+2,c+1]==p and b[r+1,c+2]==p and b[r,c+3]==p: return True
-    return False
+class RandomPolicy(Policy):
+    def mount(self) -> None:
+        pass
 
-def train_cycle(episodes=50):
-    nueva = MCTSPolicy()
-    nueva.mount(0.5) 
-    
-    try: 
+    def act(self, s):
+        valid = [c for c in range(7) if s[0,c]==0]
+        return int(np.random.choice(valid)) if valid else 0
+
+def play_episodes(args):
+    """
+    Tarea de un proceso: juega `episodes` partidas de autojuego y devuelve las
+    victorias y los cambios (deltas) de la base de conocimiento del proceso.
+    """
+    first_episode, episodes, time_out, seed = args
+    # Los procesos comparten el estado aleatorio del padre: cada tarea usa su semilla
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+
+    nueva = WinortzPolicy()
+    nueva.mount(time_out)
+    try:
         vieja = WinPolicy()
-        vieja.mount(0.5)
-    except: 
-        print("No hay rival, entrenando contra random.")
-        class RandomPolicy:
-            def act(self, s): 
-                valid = [c for c in range(7) if s[0,c]==0]
-                return np.random.choice(valid) if valid else 0
+        vieja.mount(time_out)
+    except:
         vieja = RandomPolicy()
 
-    print(f"INICIANDO ENTRENAMIENTO: {episodes} Partidas")
-    print(f"Memoria Inicial: {len(nueva.knowledge_base)} estados")
+    latencies = {"nueva": {}, "vieja": {}}
+    timeouts = {"nueva": 0, "vieja": 0}
+    wins = 0
+    for i in range(first_episode, first_episode + episodes):
+        p1, p2 = (("nueva", nueva), ("vieja", vieja)) if i % 2 == 0 else (("vieja", vieja), ("nueva", nueva))
+        winner, _, _ = play_game(p1, p2, latencies, timeouts, keep_history=False)
+        if winner != 0 and (p1 if winner == -1 else p2)[0] == "nueva":
+            wins += 1
+
+    # Solo viajan al proceso padre las estadísticas que cambiaron
+    return episodes, wins, nueva.knowledge_base.delta()
 
+def train_cycle(episodes=50, workers=None, episodes_per_task=2, checkpoint_every=10, time_out=0.5):
+    """
+    Entrenamiento por autojuego repartido en un pool de procesos.
+
+    Cada tarea juega `episodes_per_task` partidas con su propia copia de la base de
+    conocimiento y devuelve sus deltas; el proceso padre los suma a la base y guarda
+    un segmento delta cada `checkpoint_every` partidas, así que un fallo solo pierde
+    el trabajo posterior al último punto de control. Al final los segmentos se
+    compactan en el archivo base.
+    """
+    workers = workers or os.cpu_count()
+    hero = WinortzPolicy()
+    hero.mount(time_out)
+    kb = hero.knowledge_base
+
+    print(f"INICIANDO ENTRENAMIENTO: {episodes} Partidas en {workers} procesos")
+    print(f"Memoria Inicial: {len(kb)} estados")
+
+    seed = random.getrandbits(32)
+    tasks = [
+        (start, min(episodes_per_task, episodes - start), time_out, seed + start)
+        for start in range(0, episodes, episodes_per_task)
+    ]
     wins = 0
-    
-    for i in range(episodes):
-        board = np.zeros((6, 7))
-        player = 1
-        game_over = False
-        moves = 0
-        
-        p1, p2 = (nueva, vieja) if i % 2 == 0 else (vieja, nueva)
-        
-        while not game_over:
-            if p1 is None or p2 is None: break
-            
-            agent = p1 if player == 1 else p2
-            
-            try:
-                if agent == vieja:
-                    try: action = agent.act(board)
-                    except: action = np.random.choice([c for c in range(7) if board[0,c]==0])
-                else:
-                    action = agent.act(board)
-            except: break 
-            
-            for r in range(5, -1, -1):
-                if board[r, action] == 0:
-                    board[r, action] = player
-                    break
-            
-            if check_win(board, player):
-                game_over = True
-                if (agent == nueva): wins += 1
-            elif moves >= 41:
-                game_over = True
-            
-            player = -player
-            moves += 1
-            
-        print(".", end="", flush=True)
+    played = 0
+    pending = 0  # Partidas sumadas desde el último punto de control
+    with mp.Pool(workers) as pool:
+        for n, w, delta in pool.imap_unordered(play_episodes, tasks):
+            kb.merge(*delta)
+            wins += w
+            played += n
+            pending += n
+            print("." * n, end="", flush=True)
+            if pending >= checkpoint_every:
+                kb.checkpoint()
+                pending = 0
+
+    print(f"\nVictorias Nueva: {wins}/{played} ({ (wins/played)*100 }%)")
 
-    print(f"\nVictorias Nueva: {wins}/{episodes} ({ (wins/episodes)*100 }%)")
-    
-    nueva.save_smart_knowledge(min_visits=3, max_states=40000)
+    hero.save_smart_knowledge(min_visits=3, max_states=40000, compact_every=1)
 
 if __name__ == "__main__":
     train_cycle(episodes=50)